@@ -7,37 +7,76 @@ import sys
 from pathlib import Path
 import json
 import datetime
+import uuid
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Ensure project root is on sys.path
 PROJECT_ROOT = Path(__file__).resolve().parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Literal
 
-from building_graph import trading_graph, build_graph_input
+from pydantic import BaseModel, Field, field_validator
+
+from building_graph import ANALYSTS, build_trading_graph, build_graph_input
 from config.configurable import config
+from utility.instrumentation import track_run
+from utility.result_store import etag_matches, get_result_store, payload_etag, result_key, result_provenance
 
-app = FastAPI(
-    title="AI Agent Trader API",
-    description="API for stock analysis using multi-agent trading workflow",
-)
+# Routes are registered on a router and mounted by `create_app()`. Importing this module does not
+# build the graph, the LLMs or the memories; they are constructed on the first analysis request.
+router = APIRouter()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow Streamlit and other origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+def _iso_date(value: str | None) -> str | None:
+    # Dates are part of the result key and compared as strings, so they are normalized to yyyy-mm-dd
+    if value is None:
+        return None
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError("must be a date in yyyy-mm-dd format") from None
 
 
 class AnalyzeRequest(BaseModel):
     ticker: str = "NVDA"
     trade_date: str | None = None  # If None, uses 2 days ago
+    # Optional pipeline overrides; each distinct combination is compiled once and cached
+    max_debate_rounds: int | None = Field(None, ge=1, le=5)
+    max_risk_discuss_rounds: int | None = Field(None, ge=1, le=5)
+    deep_think_llm: str | None = None
+    quick_think_llm: str | None = None
+    analysts: list[Literal["market", "social", "news", "fundamentals"]] | None = Field(None, min_length=1)
+    force_refresh: bool = False  # Recompute even when a cached result exists
+
+    _check_trade_date = field_validator("trade_date")(_iso_date)
+
+    @field_validator("deep_think_llm", "quick_think_llm")
+    @classmethod
+    def _check_model(cls, model: str | None) -> str | None:
+        if model is not None and model not in config["allowed_models"]:
+            raise ValueError(f"model must be one of {config['allowed_models']}")
+        return model
+
+    @field_validator("analysts")
+    @classmethod
+    def _canonical_analysts(cls, analysts: list[str] | None) -> list[str] | None:
+        # Pipeline order is fixed, so ["news", "social"] and ["social", "news"] share one compiled graph
+        return None if analysts is None else [key for key in ANALYSTS if key in analysts]
+
+    def run_config(self) -> dict:
+        """The global config with this request's overrides applied."""
+        overrides = self.model_dump(
+            include={"max_debate_rounds", "max_risk_discuss_rounds", "deep_think_llm", "quick_think_llm", "analysts"},
+            exclude_none=True,
+        )
+        return {**config, **overrides}
 
 
 class AnalyzeResponse(BaseModel):
@@ -49,86 +88,299 @@ class AnalyzeResponse(BaseModel):
     news_report: str
     fundamentals_report: str
     investment_plan: str
+    llm_call_paths: list[dict] = []  # Per-node LLM path: primary / hedged / fallback
+    timings: dict = {}  # Per-run breakdown: nodes, LLM calls/tokens, tools, memory, ReAct iterations
+
+
+def _graph_config(run_config: dict = config, priority: str = "interactive", as_of: str | None = None) -> dict:
+    """
+    Graph run config; API runs are interactive unless started by /screen, and each gets its own id for
+    fair LLM scheduling. `as_of` makes the run point-in-time (see `utility.market_data`).
+    """
+    metadata = {"priority": priority, "analysis_id": uuid.uuid4().hex}
+    if as_of:
+        metadata["as_of"] = as_of
+    return {"recursion_limit": run_config["max_recur_limit"], "metadata": metadata}
+
+
+def _response_payload(ticker: str, trade_date: str, state: dict, llm_call_paths: list[dict], timings: dict) -> dict:
+    """The `AnalyzeResponse` body for a finished run (also the cached payload and the final SSE event)."""
+    return AnalyzeResponse(
+        ticker=ticker,
+        trade_date=trade_date,
+        final_trade_decision=state.get("final_trade_decision", ""),
+        market_report=state.get("market_report", ""),
+        sentiment_report=state.get("sentiment_report", ""),
+        news_report=state.get("news_report", ""),
+        fundamentals_report=state.get("fundamentals_report", state.get("fundamental_report", "")),
+        investment_plan=state.get("investment_plan", ""),
+        llm_call_paths=llm_call_paths,
+        timings=timings,
+    ).model_dump()
+
+
+def _cached_result(request: AnalyzeRequest, key: str):
+    """`(etag, payload)` from the result store, or None when disabled, refreshed or missing."""
+    if not config["result_cache_enabled"] or request.force_refresh:
+        return None
+    return get_result_store().get(key)
+
+
+def _store_result(key: str, trade_date: str, payload: dict, provenance: dict) -> str:
+    if not config["result_cache_enabled"]:
+        return payload_etag(payload)
+    return get_result_store().put(key, trade_date, payload, provenance)
+
+
+# Concurrent requests for the same (ticker, trade_date, config) wait for the first one instead of recomputing
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _single_flight(key: str):
+    with _inflight_lock:
+        entry = _inflight.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _inflight_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _inflight[key]
 
 
-def _run_analysis(ticker: str, trade_date: str) -> dict:
-    """Run the trading graph and return the final state."""
+def _conditional_response(payload: dict, etag: str, if_none_match: str | None, cache_status: str) -> Response:
+    headers = {"ETag": etag, "X-Cache": cache_status}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
+
+def _run_analysis(
+    ticker: str, trade_date: str, run_config: dict = config, priority: str = "interactive", as_of: str | None = None,
+) -> tuple[dict, dict]:
+    """Run the trading graph and return the final state and the run's timing breakdown."""
     if not trade_date:
         trade_date = (datetime.date.today() - datetime.timedelta(days=2)).strftime("%Y-%m-%d")
 
     graph_input = build_graph_input(ticker, trade_date)
-    graph_config = {"recursion_limit": config["max_recur_limit"]}
+    graph_config = _graph_config(run_config, priority, as_of)
 
     # `stream()` yields per-node updates, not the full accumulated state.
     # For non-streaming callers we want the final full state, so use `invoke()`.
-    return trading_graph.invoke(graph_input, config=graph_config)
+    graph = build_trading_graph(run_config)
+    with track_run(graph_config["metadata"]["analysis_id"]) as timings:
+        state = graph.invoke(graph_input, config=graph_config)
+    return state, timings.as_dict()
+
+
+def _analyze_cached(
+    request: AnalyzeRequest, priority: str = "interactive", as_of: str | None = None,
+) -> tuple[str, dict, str]:
+    """Serve an analysis from the result store or run it; returns `(etag, payload, "HIT" | "MISS")`."""
+    trade_date = request.trade_date or (
+        datetime.date.today() - datetime.timedelta(days=2)
+    ).strftime("%Y-%m-%d")
+    run_config = request.run_config()
+    key = result_key(request.ticker, trade_date, run_config, as_of)
+
+    cached = _cached_result(request, key)
+    if cached is None:
+        with _single_flight(key):
+            # A concurrent request may have stored this result while we waited
+            cached = _cached_result(request, key)
+            if cached is None:
+                state, timings = _run_analysis(request.ticker, trade_date, run_config, priority, as_of)
+                payload = _response_payload(request.ticker, trade_date, state, state.get("llm_call_paths", []), timings)
+                return _store_result(key, trade_date, payload, result_provenance(run_config, as_of)), payload, "MISS"
 
+    etag, payload = cached
+    return etag, payload, "HIT"
 
-@app.post("/analyze", response_model=AnalyzeResponse)
-def analyze(request: AnalyzeRequest):
+
+@router.post(
+    "/analyze",
+    response_model=AnalyzeResponse,
+    responses={304: {"description": "Not modified: If-None-Match matches the result's ETag"}},
+)
+def analyze(request: AnalyzeRequest, if_none_match: str | None = Header(None)):
     """
     Run full analysis and return the complete result.
     Use this for non-streaming; may take several minutes.
+
+    Results are cached by (ticker, trade_date, config): repeat requests are served from the result
+    store (`X-Cache: HIT`) unless `force_refresh` is set. Every response carries an `ETag`; send it
+    back in `If-None-Match` to get `304 Not Modified` instead of the body.
     """
-    trade_date = request.trade_date or (
-        datetime.date.today() - datetime.timedelta(days=2)
-    ).strftime("%Y-%m-%d")
+    etag, payload, cache_status = _analyze_cached(request)
+    return _conditional_response(payload, etag, if_none_match, cache_status)
 
-    state = _run_analysis(request.ticker, trade_date)
 
-    return AnalyzeResponse(
-        ticker=request.ticker,
-        trade_date=trade_date,
-        final_trade_decision=state.get("final_trade_decision", ""),
-        market_report=state.get("market_report", ""),
-        sentiment_report=state.get("sentiment_report", ""),
-        news_report=state.get("news_report", ""),
-        fundamentals_report=state.get("fundamentals_report", state.get("fundamental_report", "")),
-        investment_plan=state.get("investment_plan", ""),
-    )
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
 
 
-@app.post("/analyze/stream")
-def analyze_stream(request: AnalyzeRequest):
+@router.post(
+    "/analyze/stream",
+    responses={304: {"description": "Not modified: If-None-Match matches the cached result's ETag"}},
+)
+def analyze_stream(request: AnalyzeRequest, if_none_match: str | None = Header(None)):
     """
     Run analysis and stream node execution updates as Server-Sent Events (SSE).
     Streamlit can consume this for real-time progress.
+    Shares the result cache with `/analyze`: a cached result is replayed as a single final event with
+    `cached: true` (or `304 Not Modified` when `If-None-Match` matches its `ETag`), and concurrent
+    requests for the same analysis wait for the first one and then replay its result.
     """
     trade_date = request.trade_date or (
         datetime.date.today() - datetime.timedelta(days=2)
     ).strftime("%Y-%m-%d")
 
+    run_config = request.run_config()
+    key = result_key(request.ticker, trade_date, run_config)
+    cached = _cached_result(request, key)
+    if cached is not None:
+        etag, payload = cached
+        headers = {"Cache-Control": "no-cache", "ETag": etag, "X-Cache": "HIT"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return StreamingResponse(
+            iter([_sse({"done": True, "cached": True, **payload})]), media_type="text/event-stream", headers=headers,
+        )
+
+    graph = build_trading_graph(run_config)
     graph_input = build_graph_input(request.ticker, trade_date)
-    graph_config = {"recursion_limit": config["max_recur_limit"]}
+    graph_config = _graph_config(run_config)
 
     def generate():
-        # Accumulate node updates so the final SSE payload includes reports from earlier nodes.
-        # (LangGraph `stream()` yields updates; it does not automatically yield the full state.)
-        accumulated_state = dict(graph_input)
+        with _single_flight(key):
+            # A concurrent request may have stored this result while we waited
+            cached = _cached_result(request, key)
+            if cached is not None:
+                yield _sse({"done": True, "cached": True, **cached[1]})
+                return
 
-        for chunk in trading_graph.stream(graph_input, config=graph_config):
-            node_name = list(chunk.keys())[0]
-            node_update = chunk[node_name] or {}
+            # Accumulate node updates so the final SSE payload includes reports from earlier nodes.
+            # (LangGraph `stream()` yields updates; it does not automatically yield the full state.)
+            accumulated_state = dict(graph_input)
+            llm_call_paths = []
 
-            if isinstance(node_update, dict):
-                accumulated_state.update(node_update)
+            with track_run(graph_config["metadata"]["analysis_id"]) as timings:
+                for chunk in graph.stream(graph_input, config=graph_config):
+                    node_name = list(chunk.keys())[0]
+                    node_update = chunk[node_name] or {}
 
-            yield f"data: {json.dumps({'node': node_name})}\n\n"
+                    if isinstance(node_update, dict):
+                        # `llm_call_paths` is an append-only channel; everything else is last-write-wins.
+                        llm_call_paths.extend(node_update.get("llm_call_paths", []))
+                        accumulated_state.update(node_update)
 
-        yield f"data: {json.dumps({'done': True, 'final_trade_decision': accumulated_state.get('final_trade_decision', ''), 'market_report': accumulated_state.get('market_report', ''), 'sentiment_report': accumulated_state.get('sentiment_report', ''), 'news_report': accumulated_state.get('news_report', ''), 'fundamentals_report': accumulated_state.get('fundamentals_report', accumulated_state.get('fundamental_report', '')), 'investment_plan': accumulated_state.get('investment_plan', '')})}\n\n"
+                    yield _sse({"node": node_name})
+
+            payload = _response_payload(request.ticker, trade_date, accumulated_state, llm_call_paths, timings.as_dict())
+            _store_result(key, trade_date, payload, result_provenance(run_config))
+        yield _sse({"done": True, "cached": False, **payload})
 
     return StreamingResponse(
         generate(),
         media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Cache": "MISS"},
     )
 
 
-@app.get("/health")
+class ScreenRequest(BaseModel):
+    tickers: list[str] = Field(..., min_length=1, max_length=5000)
+    top_n: int | None = Field(None, ge=1, le=100)
+    as_of: str | None = None  # Screen (and analyze) on data strictly before this date; default today
+    weights: dict[Literal["momentum", "breakout", "rsi"], float] | None = None
+    analyze: bool = False  # Run the top `screener_api_max_analyses` through the trading graph
+    trade_date: str | None = None  # Trade date for those analyses; default as in /analyze
+
+    _check_dates = field_validator("as_of", "trade_date")(_iso_date)
+
+
+@router.post("/screen")
+def screen(request: ScreenRequest):
+    """
+    Rank a ticker universe with the vectorized pre-screener (momentum, volatility breakout, RSI extremes)
+    and return the top N. With `analyze`, the best `screener_api_max_analyses` are also run through the
+    trading graph as `batch` priority runs, point-in-time when `as_of` is set (served from the result
+    cache when available), and returned under `analyses`. The remaining tickers are listed under
+    `not_analyzed`; analyze them with `/analyze` or `screen.py --analyze`.
+    """
+    from utility.screener import screen as run_screen
+
+    ranked = run_screen(request.tickers, as_of=request.as_of, top_n=request.top_n, weights=request.weights)
+    response = {"ranked": ranked}
+    if request.analyze and ranked:
+        selected = ranked[:config["screener_api_max_analyses"]]
+        with ThreadPoolExecutor(max_workers=config["screener_max_parallel_runs"]) as pool:
+            results = pool.map(
+                lambda row: _analyze_cached(
+                    AnalyzeRequest(ticker=row["ticker"], trade_date=request.trade_date), priority="batch", as_of=request.as_of,
+                ),
+                selected,
+            )
+            response["analyses"] = [payload for _, payload, _ in results]
+        response["not_analyzed"] = [row["ticker"] for row in ranked[len(selected):]]
+    return response
+
+
+@router.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@router.get("/scheduler")
+def scheduler_metrics():
+    """LLM scheduler queue depth and admission wait times."""
+    from utility.llm_scheduler import get_scheduler
+
+    return get_scheduler().metrics()
+
+
+@router.get("/metrics")
+def metrics():
+    """Prometheus metrics: node, LLM, tool and memory latencies, token counts, scheduler queues."""
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(app: FastAPI):
+    import anyio.to_thread
+
+    # Blocking endpoints (each one a graph run) share anyio's thread limiter; the LLM deadline pool is sized from the same number
+    anyio.to_thread.current_default_thread_limiter().total_tokens = config["api_worker_threads"]
+    yield
+
+
+def create_app() -> FastAPI:
+    """Application factory (also usable as `uvicorn --factory api:create_app`)."""
+    app = FastAPI(
+        title="AI Agent Trader API",
+        description="API for stock analysis using multi-agent trading workflow",
+        lifespan=_lifespan,
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow Streamlit and other origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(router)
+    return app
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,307 @@
+"""
+Parallel backtesting of the trading graph over a ticker x date grid.
+
+- Prices for every ticker are cached locally once (`utility.market_data`), covering the lookback
+  before the first trade date and the forward-return horizon after the last one.
+- Graph runs execute in a process pool. Every process works point-in-time: `online_tools` is off,
+  so tools read only the local cache, and each run carries `as_of=<trade date>` in its metadata, so
+  no tool returns data from the trade date or later.
+- LLM requests are capped across all processes by a shared semaphore (`backtest_llm_concurrency`),
+  and each process gets an equal share of the configured RPM/TPM limits. Runs use the `batch` priority.
+- Completed cells are appended to `decisions.jsonl` in the output directory; re-running the same
+  command skips them (cells that failed are retried).
+- At the end, decisions are joined with realized forward returns and written to `results.parquet`,
+  with summary statistics and throughput metrics in `summary.json`.
+
+Usage:
+    python backtest.py --tickers NVDA AAPL --start 2024-01-02 --end 2024-06-28 --every 5
+    python backtest.py --tickers NVDA --start 2024-01-02 --end 2024-03-28 --workers 8 --llm-concurrency 16 --out results/nvda_q1
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Ensure project root is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config, config_hash
+
+DECISION_POSITIONS = {"BUY": 1, "HOLD": 0, "SELL": -1}
+_DECISION_PATTERN = re.compile(r"FINAL TRANSACTION PROPOSAL:\s*\**\s*(BUY|SELL|HOLD)\b", re.IGNORECASE)
+# A labelled verdict ("**Final Decision: Hold**", "Recommendation - SELL"), as in Portfolio Manager answers
+# written before its prompt asked for the proposal line
+_VERDICT_PATTERN = re.compile(
+    r"\b(?:decision|recommendation|verdict)\**\s*[:\-]\s*\**\s*(BUY|SELL|HOLD)\b", re.IGNORECASE
+)
+
+
+def extract_decision(text):
+    """
+    BUY/SELL/HOLD from the last 'FINAL TRANSACTION PROPOSAL' line of a decision text, else from its last
+    labelled verdict ('Decision: ...'), or '' if there is neither. Unlabelled free text is not searched:
+    the reasoning may mention any of the three.
+    """
+    matches = _DECISION_PATTERN.findall(text or "") or _VERDICT_PATTERN.findall(text or "")
+    return matches[-1].upper() if matches else ""
+
+
+def prefetch_prices(tickers, start_date, end_date, horizons=None, lookback_days=None):
+    """Cache each ticker's history from the lookback window through the longest forward horizon."""
+    from utility.market_data import update_price_cache
+
+    horizons = horizons or config["backtest_horizons"]
+    lookback_days = lookback_days if lookback_days is not None else config["backtest_lookback_days"]
+    first = datetime.date.fromisoformat(start_date) - datetime.timedelta(days=lookback_days)
+    # Trading days -> calendar days, with slack for holidays
+    last = datetime.date.fromisoformat(end_date) + datetime.timedelta(days=2 * max(horizons) + 7)
+    last = min(last, datetime.date.today())
+    for ticker in tickers:
+        update_price_cache(ticker, first.isoformat(), last.isoformat())
+
+
+def build_grid(tickers, start_date, end_date, every=1):
+    """(ticker, trade date) cells: every `every`-th cached trading day of each ticker in [start_date, end_date]."""
+    from utility.market_data import trading_days
+
+    return [(ticker, day) for ticker in tickers for day in trading_days(ticker, start_date, end_date)[::every]]
+
+
+def _init_worker(llm_slots, overrides, workers):
+    """Process-pool initializer: point-in-time tools, shared LLM concurrency cap, per-process rate-limit share."""
+    from utility.llm_scheduler import get_scheduler
+
+    config.update(overrides)
+    config["online_tools"] = False
+    config["llm_rate_limits"] = {
+        model: {name: limit / workers for name, limit in limits.items()}
+        for model, limits in config["llm_rate_limits"].items()
+    }
+    config["llm_default_rate_limit"] = {name: limit / workers for name, limit in config["llm_default_rate_limit"].items()}
+    get_scheduler().set_concurrency_limit(llm_slots)
+
+
+def run_cell(ticker, trade_date):
+    """Run the graph for one cell and return its decision row."""
+    from building_graph import build_graph_input, build_trading_graph
+    from utility.instrumentation import track_run
+
+    analysis_id = uuid.uuid4().hex
+    graph_config = {
+        "recursion_limit": config["max_recur_limit"],
+        "metadata": {"priority": "batch", "analysis_id": analysis_id, "as_of": trade_date},
+    }
+    row = {"ticker": ticker, "trade_date": trade_date, "decision": "", "final_trade_decision": "", "error": ""}
+    started = time.perf_counter()
+    try:
+        graph = build_trading_graph(config)
+        with track_run(analysis_id) as timings:
+            state = graph.invoke(build_graph_input(ticker, trade_date), config=graph_config)
+    except Exception as e:
+        row.update(error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - started)
+        return row
+
+    breakdown = timings.as_dict()
+    final_trade_decision = state.get("final_trade_decision", "")
+    row.update(
+        decision=extract_decision(final_trade_decision) or extract_decision(state.get("trader_investment_plan", "")),
+        final_trade_decision=final_trade_decision,
+        seconds=breakdown["total_seconds"],
+        llm_calls=sum(stat["calls"] for stat in breakdown["llm"].values()),
+        prompt_tokens=sum(stat["prompt_tokens"] for stat in breakdown["llm"].values()),
+        completion_tokens=sum(stat["completion_tokens"] for stat in breakdown["llm"].values()),
+        fallbacks=sum(1 for record in state.get("llm_call_paths", []) if record["path"] == "fallback"),
+    )
+    return row
+
+
+def load_checkpoint(path):
+    """Rows already written to `decisions.jsonl` (later lines win for the same cell)."""
+    rows = {}
+    if path.exists():
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    rows[(row["ticker"], row["trade_date"])] = row
+    return rows
+
+
+def add_forward_returns(frame, horizons):
+    """Add `fwd_return_<h>d` (close of the trade date to close `h` trading days later) and `strategy_return_<h>d`."""
+    import numpy as np
+    import pandas as pd
+
+    from utility.market_data import load_cached_prices
+
+    for h in horizons:
+        frame[f"fwd_return_{h}d"] = np.nan
+    for ticker, rows in frame.groupby("ticker"):
+        prices = load_cached_prices(ticker)
+        if prices is None or prices.empty:
+            continue
+        close = prices["Close"].to_numpy()
+        # Entry on the trade date's close (or the next session's if the trade date was not a trading day)
+        entry = prices.index.searchsorted(pd.to_datetime(rows["trade_date"]))
+        for h in horizons:
+            exit_ = entry + h
+            valid = exit_ < len(close)
+            returns = np.full(len(rows), np.nan)
+            returns[valid] = close[exit_[valid]] / close[entry[valid]] - 1
+            frame.loc[rows.index, f"fwd_return_{h}d"] = returns
+    position = frame["decision"].map(DECISION_POSITIONS)
+    for h in horizons:
+        frame[f"strategy_return_{h}d"] = position * frame[f"fwd_return_{h}d"]
+    return frame
+
+
+def summarize(frame, horizons, wall_seconds, workers, cells_run, run_seconds):
+    """
+    Decision mix, per-horizon return statistics and throughput for a results frame.
+    `cells_run` / `run_seconds` cover only the cells executed by this invocation (not those resumed).
+    """
+    ok = frame[frame["error"] == ""]
+    summary = {
+        "cells": len(frame),
+        "completed": len(ok),
+        "errors": int((frame["error"] != "").sum()),
+        "decisions": {decision: int(count) for decision, count in ok["decision"].replace("", "UNPARSED").value_counts().items()},
+        "horizons": {},
+    }
+    directional = ok[ok["decision"].isin(["BUY", "SELL"])]
+    for h in horizons:
+        fwd, strat = f"fwd_return_{h}d", f"strategy_return_{h}d"
+        scored = directional.dropna(subset=[fwd])
+        summary["horizons"][f"{h}d"] = {
+            "mean_forward_return_by_decision": {decision: float(group[fwd].mean()) for decision, group in ok.dropna(subset=[fwd]).groupby("decision")},
+            "hit_rate": float((scored[strat] > 0).mean()) if len(scored) else None,
+            "mean_strategy_return": float(ok[strat].dropna().mean()) if ok[strat].notna().any() else None,
+            "scored_cells": int(ok[strat].notna().sum()),
+        }
+    total_cell_seconds = float(ok["seconds"].sum()) if len(ok) else 0.0
+    tokens = float(ok[["prompt_tokens", "completion_tokens"]].sum().sum()) if len(ok) else 0.0
+    summary["throughput"] = {
+        "wall_seconds": round(wall_seconds, 2),
+        "cells_run": cells_run,
+        "mean_cell_seconds": total_cell_seconds / len(ok) if len(ok) else None,
+        "cells_per_hour": 3600 * cells_run / wall_seconds if cells_run and wall_seconds else None,
+        "tokens_per_second": tokens / total_cell_seconds if total_cell_seconds else None,
+        # Summed run time over (wall time x workers): how well the pool was kept busy
+        "parallel_efficiency": run_seconds / (wall_seconds * workers) if cells_run and wall_seconds else None,
+    }
+    return summary
+
+
+def run_backtest(tickers, start_date, end_date, out_dir, every=1, workers=None, llm_concurrency=None, overrides=None, fetch=True):
+    """Run (or resume) a backtest and return `(results DataFrame, summary dict)`."""
+    import pandas as pd
+
+    workers = workers or config["backtest_max_workers"]
+    llm_concurrency = llm_concurrency or config["backtest_llm_concurrency"]
+    overrides = overrides or {}
+    horizons = config["backtest_horizons"]
+    out_dir = Path(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # A checkpoint may only be resumed with the same graph variant
+    variant = config_hash({**config, **overrides})
+    manifest_path = out_dir / "run.json"
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest["config_hash"] != variant:
+            raise ValueError(f"{out_dir} holds a backtest of config {manifest['config_hash']}, not {variant}; use another --out")
+    manifest_path.write_text(json.dumps({"config_hash": variant, "overrides": overrides}, indent=2))
+
+    if fetch:
+        prefetch_prices(tickers, start_date, end_date, horizons)
+    grid = build_grid(tickers, start_date, end_date, every)
+
+    checkpoint_path = out_dir / "decisions.jsonl"
+    rows = load_checkpoint(checkpoint_path)
+    pending = [cell for cell in grid if cell not in rows or rows[cell]["error"]]
+    print(f"{len(grid)} cells, {len(grid) - len(pending)} already done, {len(pending)} to run on {workers} workers")
+
+    started = time.perf_counter()
+    run_seconds = 0.0
+    if pending:
+        ctx = multiprocessing.get_context("spawn")
+        llm_slots = ctx.BoundedSemaphore(llm_concurrency)
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(llm_slots, overrides, workers)
+        ) as pool, open(checkpoint_path, "a") as checkpoint:
+            futures = [pool.submit(run_cell, ticker, trade_date) for ticker, trade_date in pending]
+            for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                row = future.result()
+                rows[(row["ticker"], row["trade_date"])] = row
+                run_seconds += row["seconds"]
+                checkpoint.write(json.dumps(row) + "\n")
+                checkpoint.flush()
+                status = row["error"] or row["decision"] or "no decision"
+                print(f"[{done}/{len(pending)}] {row['ticker']} {row['trade_date']}: {status} ({row['seconds']:.1f}s)", flush=True)
+    wall_seconds = time.perf_counter() - started
+
+    frame = pd.DataFrame([rows[cell] for cell in grid if cell in rows])
+    for column in ("seconds", "llm_calls", "prompt_tokens", "completion_tokens", "fallbacks"):
+        if column not in frame:
+            frame[column] = 0
+    frame = add_forward_returns(frame, horizons)
+    summary = summarize(frame, horizons, wall_seconds, workers, len(pending), run_seconds)
+
+    frame.to_parquet(out_dir / "results.parquet", index=False)
+    (out_dir / "summary.json").write_text(json.dumps(summary, indent=2))
+    return frame, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", nargs="+", required=True)
+    parser.add_argument("--start", required=True, help="first trade date (yyyy-mm-dd)")
+    parser.add_argument("--end", required=True, help="last trade date (yyyy-mm-dd)")
+    parser.add_argument("--every", type=int, default=1, help="use every N-th trading day")
+    parser.add_argument("--workers", type=int, help=f"parallel graph runs (default {config['backtest_max_workers']})")
+    parser.add_argument("--llm-concurrency", type=int, help=f"in-flight LLM requests across workers (default {config['backtest_llm_concurrency']})")
+    parser.add_argument("--out", default=os.path.join(config["results_dir"], "backtest"), help="output / checkpoint directory")
+    parser.add_argument("--no-fetch", action="store_true", help="use the price cache as is (no downloads)")
+    parser.add_argument("--deep-think-llm")
+    parser.add_argument("--quick-think-llm")
+    parser.add_argument("--max-debate-rounds", type=int)
+    parser.add_argument("--max-risk-discuss-rounds", type=int)
+    parser.add_argument("--analysts", nargs="+")
+    args = parser.parse_args(argv)
+
+    overrides = {
+        key: value
+        for key, value in {
+            "deep_think_llm": args.deep_think_llm,
+            "quick_think_llm": args.quick_think_llm,
+            "max_debate_rounds": args.max_debate_rounds,
+            "max_risk_discuss_rounds": args.max_risk_discuss_rounds,
+            "analysts": args.analysts,
+        }.items()
+        if value is not None
+    }
+    if "analysts" in overrides:
+        from building_graph import ANALYSTS
+
+        # Canonical pipeline order, so the checkpoint's config hash does not depend on argument order
+        overrides["analysts"] = [key for key in ANALYSTS if key in overrides["analysts"]]
+    tickers = [ticker.upper() for ticker in args.tickers]
+    _, summary = run_backtest(
+        tickers, args.start, args.end, args.out, every=args.every, workers=args.workers,
+        llm_concurrency=args.llm_concurrency, overrides=overrides, fetch=not args.no_fetch,
+    )
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Deterministic stand-ins for every external dependency, so the graph can run offline with zero latency.
+
+- `ScriptedChatModel`: a chat model that emits one tool call per bound tool, then a scripted reply.
+- `FakeYFinance`, `FakeFinnhubClient`, `FakeTavilyClient`: fixture-backed data providers.
+- `StubOpenAIClient`: a local embedding stub (hash-seeded unit vectors, same dimension as OpenAI's).
+- `offline_environment()`: patches the above into `utility.tools`, `utility.memory` and
+  `config.llm_initializing` for the duration of a `with` block; `offline_data_providers()` patches
+  only the data providers (used by the load test, where the LLMs are served by `benchmarks.stub_openai`).
+"""
+import contextlib
+import datetime
+import hashlib
+import json
+import re
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+EMBEDDING_DIM = 1536
+
+_CONTEXT_PATTERN = re.compile(r"current date is (\d{4}-\d{2}-\d{2})\. The company we want to look at is (\S+)")
+_ANALYZE_PATTERN = re.compile(r"Analyze (\S+) for trading on (\d{4}-\d{2}-\d{2})")
+
+
+def _seed(text):
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+
+
+def scripted_tool_args(parameter_names, prompt_text):
+    """Tool-call arguments for the ticker/date mentioned in the prompt (the analyst system prompt or the first message)."""
+    match = _CONTEXT_PATTERN.search(prompt_text)
+    if match:
+        trade_date, ticker = match.groups()
+    else:
+        match = _ANALYZE_PATTERN.search(prompt_text)
+        ticker, trade_date = match.groups() if match else ("NVDA", "2025-01-02")
+    start_date = (datetime.date.fromisoformat(trade_date) - datetime.timedelta(days=30)).isoformat()
+    values = {"symbol": ticker, "ticker": ticker, "trade_date": trade_date, "start_date": start_date, "end_date": trade_date}
+    return {name: values[name] for name in parameter_names}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model. When tools are bound and the last message is not a tool result,
+    it calls every bound tool once (arguments filled from the ticker/date in the prompt);
+    otherwise it answers with `reply`. Reports token usage like the OpenAI integration does.
+    """
+
+    model_name: str = "scripted"
+    reply: str = "Scripted analysis. FINAL TRANSACTION PROPOSAL: **BUY**"
+    tool_parameters: dict[str, list[str]] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs: Any):
+        specs = [convert_to_openai_tool(tool)["function"] for tool in tools]
+        return self.model_copy(update={"tool_parameters": {spec["name"]: list(spec["parameters"]["properties"]) for spec in specs}})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.tool_parameters and not isinstance(messages[-1], ToolMessage):
+            text = "\n".join(str(message.content) for message in messages)
+            tool_calls = [
+                {"name": name, "args": scripted_tool_args(params, text), "id": f"call_{index}"}
+                for index, (name, params) in enumerate(self.tool_parameters.items())
+            ]
+            message = AIMessage(content="", tool_calls=tool_calls)
+        else:
+            message = AIMessage(content=f"{self.model_name}: {self.reply}")
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = len(str(message.content)) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": usage})
+
+
+def price_frame(symbol, start, end):
+    """Deterministic OHLCV random walk for `symbol` over business days in [start, end)."""
+    dates = pd.bdate_range(start=start, end=pd.Timestamp(end) - pd.Timedelta(days=1))
+    rng = np.random.default_rng(_seed(symbol.upper()))
+    # Walk from a fixed origin so the same date always gets the same price regardless of the window
+    origin = pd.Timestamp("2000-01-03")
+    offsets = np.asarray((dates - origin).days, dtype=np.int64)
+    steps = rng.normal(0.0001, 0.015, size=int(offsets.max(initial=0)) + 1)
+    close = 100 * np.exp(np.cumsum(steps))[offsets] if len(offsets) else np.array([])
+    frame = pd.DataFrame(
+        {
+            "Open": close * 0.995,
+            "High": close * 1.01,
+            "Low": close * 0.99,
+            "Close": close,
+            "Volume": (1_000_000 + (offsets % 97) * 10_000).astype(float),
+        },
+        index=pd.DatetimeIndex(dates, name="Date"),
+    )
+    return frame
+
+
+class FakeYFinance:
+    """Stands in for the `yfinance` module (`Ticker(...).history` and `download`)."""
+
+    class Ticker:
+        def __init__(self, symbol, session=None):
+            self.symbol = symbol
+
+        def history(self, start=None, end=None, **kwargs):
+            return price_frame(self.symbol, start, end)
+
+    @staticmethod
+    def download(tickers, start=None, end=None, **kwargs):
+        if isinstance(tickers, str):
+            return price_frame(tickers, start, end)
+        frames = {symbol: price_frame(symbol, start, end) for symbol in tickers}
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+
+class FakeFinnhubClient:
+    """Fixture-backed `finnhub.Client`."""
+
+    def __init__(self):
+        self._articles = json.loads((FIXTURES_DIR / "finnhub_news.json").read_text())
+
+    def company_news(self, ticker, _from=None, to=None):
+        return [
+            {key: value.replace("{ticker}", ticker) if isinstance(value, str) else value for key, value in article.items()}
+            for article in self._articles
+        ]
+
+
+class FakeTavilyClient:
+    """Fixture-backed Tavily client (`search(query)`)."""
+
+    def __init__(self):
+        self._results = json.loads((FIXTURES_DIR / "tavily_results.json").read_text())
+
+    def search(self, query):
+        kind = "social" if "social" in query else "fundamental" if "fundamental" in query else "macro"
+        ticker = query.split(" for ")[-1].split(" ")[0] if " for " in query else ""
+        date = query.rsplit(" ", 1)[-1]
+        return [
+            {"url": hit["url"], "content": hit["content"].replace("{ticker}", ticker).replace("{date}", date)}
+            for hit in self._results[kind]
+        ]
+
+
+def stub_embedding(text, dim=EMBEDDING_DIM):
+    """Deterministic unit vector seeded by the text."""
+    vector = np.random.default_rng(_seed(text)).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class StubOpenAIClient:
+    """Implements the `client.embeddings.create(model=..., input=...)` call used by the memories."""
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.embeddings = SimpleNamespace(create=self._create)
+        self.dim = dim
+
+    def _create(self, model, input):
+        texts = [input] if isinstance(input, str) else list(input)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=stub_embedding(text, self.dim)) for text in texts])
+
+
+@contextlib.contextmanager
+def offline_data_providers(corpus_dir=None):
+    """
+    Patch only the market-data and search providers (yfinance, Finnhub, Tavily) with the fixture-backed
+    fakes. Fixture articles go to a news corpus in `corpus_dir` (a temporary directory by default),
+    never the real one, whose coverage would otherwise serve them to real runs.
+    """
+    import utility.tools as tools
+    from utility.news_corpus import NewsCorpus
+
+    fake_finnhub = FakeFinnhubClient()
+    fake_tavily = FakeTavilyClient()
+    with contextlib.ExitStack() as stack:
+        if corpus_dir is None:
+            corpus_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="bench-corpus-"))
+        corpus = NewsCorpus(Path(corpus_dir) / "news_corpus.sqlite")
+        stack.enter_context(mock.patch.object(tools, "yf", FakeYFinance))
+        stack.enter_context(mock.patch.object(tools, "get_finnhub_client", lambda: fake_finnhub))
+        stack.enter_context(mock.patch.object(tools, "get_tavily_client", lambda: fake_tavily))
+        stack.enter_context(mock.patch.object(tools, "get_news_corpus", lambda: corpus))
+        yield
+
+
+@contextlib.contextmanager
+def offline_environment(reply=None):
+    """
+    Patch scripted models, fixture data providers and stub embeddings (with a throwaway Chroma
+    directory and news corpus) into the application. Yields the temporary data directory.
+    """
+    import chromadb
+
+    import config.llm_initializing as llm_initializing
+    import utility.memory as memory
+
+    models = {}
+
+    def get_chat_model(model_name):
+        if model_name not in models:
+            models[model_name] = ScriptedChatModel(model_name=model_name, **({"reply": reply} if reply else {}))
+        return models[model_name]
+
+    with tempfile.TemporaryDirectory(prefix="bench-chroma-") as data_dir:
+        chroma_client = chromadb.PersistentClient(path=data_dir)
+        memories = {}
+
+        def get_memory(name):
+            if name not in memories:
+                with mock.patch.object(memory, "get_openai_client", StubOpenAIClient), \
+                        mock.patch.object(memory, "get_chroma_client", lambda path: chroma_client):
+                    memories[name] = memory.FinancialSituationMemory(name, {**memory.config, "data_cache_dir": data_dir})
+            return memories[name]
+
+        with mock.patch.object(llm_initializing, "get_chat_model", get_chat_model), \
+                mock.patch.object(memory, "get_memory", get_memory), \
+                offline_data_providers(corpus_dir=data_dir):
+            yield Path(data_dir)
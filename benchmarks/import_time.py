@@ -0,0 +1,82 @@
+"""
+Import-time budget for the application entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for each entry point,
+reports the cumulative import time and the heaviest top-level packages, and fails (exit code 1)
+when a module exceeds its budget in `benchmarks/thresholds.json`.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeat 5 --top 15
+"""
+import argparse
+import collections
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+THRESHOLDS_PATH = Path(__file__).resolve().parent / "thresholds.json"
+
+
+def load_thresholds():
+    with open(THRESHOLDS_PATH) as f:
+        return json.load(f)
+
+
+def measure_import(module):
+    """Return (total seconds, {top-level package: cumulative seconds}) for one cold import."""
+    env = dict(os.environ)
+    # Entry points must be importable without credentials; nothing should need them at import time.
+    env.pop("OPENAI_API_KEY", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    total_us = 0
+    packages = collections.Counter()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Self times never overlap, so summing them per top-level package attributes the cost correctly
+        packages[name.strip().split(".")[0]] += int(self_us)
+        if name.strip() == module:
+            total_us = int(cumulative_us)
+    return total_us / 1e6, {name: us / 1e6 for name, us in packages.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="cold imports per module; the fastest is reported")
+    parser.add_argument("--top", type=int, default=10, help="heaviest packages to list per module")
+    args = parser.parse_args(argv)
+
+    budgets = load_thresholds()["import_time_seconds"]
+    failures = []
+    for module, budget in budgets.items():
+        runs = [measure_import(module) for _ in range(args.repeat)]
+        total, packages = min(runs, key=lambda run: run[0])
+        status = "ok" if total <= budget else "OVER BUDGET"
+        print(f"{module}: {total:.3f}s (budget {budget:.3f}s) {status}")
+        for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[: args.top]:
+            print(f"    {name:<30} {seconds:.3f}s")
+        if total > budget:
+            failures.append(module)
+
+    if failures:
+        print(f"Import-time budget exceeded for: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+End-to-end load test of the API against a local OpenAI-compatible stub server.
+
+1. Starts `benchmarks.stub_openai` with the requested latency distribution and token rate.
+2. Launches the API under uvicorn (`--workers N`) with `OPENAI_BASE_URL` pointing at the stub, so
+   both the chat models and the memory embeddings are served locally. Market data and search use
+   the fixture-backed providers from `benchmarks.fakes` unless `--live-data` is given. The API's
+   `data_cache_dir` (result store, memories, news corpus, price cache) is a throwaway directory, so
+   stub answers never reach the real cache.
+3. Drives `/analyze` and `/analyze/stream` at each concurrency level and reports throughput,
+   p50/p95/p99 latency and, for the stream, time to first event.
+
+The process-wide LLM scheduler still applies its RPM/TPM limits, so at high concurrency the
+reported latency includes admission waits (see `/scheduler`), exactly as in production.
+
+Usage:
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --concurrency 1 4 16 --requests 32 --workers 2 \\
+        --latency lognormal:0.8,0.4 --tokens-per-second 60 --json loadtest.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.run import percentile
+
+ENDPOINTS = ("/analyze", "/analyze/stream")
+# Set by `main` for the API processes: the throwaway `data_cache_dir` of this load test
+DATA_CACHE_ENV = "LOADTEST_DATA_CACHE_DIR"
+
+_offline_stack = contextlib.ExitStack()
+
+
+def _use_loadtest_cache():
+    from config.configurable import config
+
+    config["data_cache_dir"] = os.environ[DATA_CACHE_ENV]
+
+
+def create_live_app():
+    """uvicorn factory: the API with the real data providers and the load test's data cache."""
+    from api import create_app
+
+    _use_loadtest_cache()
+    return create_app()
+
+
+def create_offline_app():
+    """uvicorn factory: the API with fixture-backed market data and search providers."""
+    from api import create_app
+    from benchmarks.fakes import offline_data_providers
+
+    _use_loadtest_cache()
+    _offline_stack.enter_context(offline_data_providers())
+    return create_app()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url, process, timeout=120):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+@contextlib.contextmanager
+def _serve(command, ready_url, env=None):
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+    try:
+        _wait_until_ready(ready_url, process)
+        yield
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _one_request(client, endpoint, payload):
+    """Return (latency seconds, time to first event or None); raises on HTTP/stream errors."""
+    start = time.perf_counter()
+    if endpoint == "/analyze":
+        response = await client.post(endpoint, json=payload)
+        response.raise_for_status()
+        return time.perf_counter() - start, None
+
+    first_event = None
+    done = False
+    async with client.stream("POST", endpoint, json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            if first_event is None:
+                first_event = time.perf_counter() - start
+            if json.loads(line[len("data:"):]).get("done"):
+                done = True
+    if not done:
+        raise RuntimeError("stream ended without a final event")
+    return time.perf_counter() - start, first_event
+
+
+async def drive(base_url, endpoint, concurrency, requests, payload, timeout):
+    """Issue `requests` calls to `endpoint` with at most `concurrency` in flight."""
+    import httpx
+
+    latencies, first_events, errors = [], [], []
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker(client):
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                latency, first_event = await _one_request(client, endpoint, payload)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append(latency)
+            if first_event is not None:
+                first_events.append(first_event)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    result = {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+    }
+    for q in (50, 95, 99):
+        result[f"p{q}_s"] = percentile(latencies, q / 100) if latencies else None
+        if endpoint == "/analyze/stream":
+            result[f"ttfe_p{q}_s"] = percentile(first_events, q / 100) if first_events else None
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def _format(value):
+    return "-" if value is None else f"{value:.3f}"
+
+
+def print_report(results):
+    header = f"{'endpoint':<16} {'conc':>4} {'ok':>5} {'err':>4} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'ttfe50':>8} {'ttfe95':>8} {'ttfe99':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['endpoint']:<16} {r['concurrency']:>4} {r['completed']:>5} {r['errors']:>4} {r['throughput_rps']:>7.3f} "
+            f"{_format(r['p50_s']):>8} {_format(r['p95_s']):>8} {_format(r['p99_s']):>8} "
+            f"{_format(r.get('ttfe_p50_s')):>8} {_format(r.get('ttfe_p95_s')):>8} {_format(r.get('ttfe_p99_s')):>8}"
+        )
+    for r in results:
+        if r.get("first_error"):
+            print(f"{r['endpoint']} @ {r['concurrency']}: {r['errors']} errors, first: {r['first_error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8], help="in-flight requests per level")
+    parser.add_argument("--requests", type=int, default=16, help="requests per endpoint and level (at least the concurrency)")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the API")
+    parser.add_argument("--latency", default="lognormal:0.5,0.4", help="stub per-request latency distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0, help="stub generation rate; 0 disables")
+    parser.add_argument("--completion-tokens", type=int, default=300, help="tokens in each stub text answer")
+    parser.add_argument("--ticker", default="NVDA")
+    parser.add_argument("--trade-date", default="2025-01-02")
+    parser.add_argument("--timeout", type=float, default=900.0, help="per-request client timeout in seconds")
+    parser.add_argument("--live-data", action="store_true", help="use the real yfinance/Finnhub/Tavily providers")
+    parser.add_argument("--use-cache", action="store_true", help="allow result-cache hits (default: force_refresh every request)")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    stub_port, api_port = _free_port(), _free_port()
+    stub_command = [
+        sys.executable, "-m", "benchmarks.stub_openai", "--port", str(stub_port), "--latency", args.latency,
+        "--tokens-per-second", str(args.tokens_per_second), "--completion-tokens", str(args.completion_tokens),
+    ]
+    app_target = "benchmarks.loadtest:create_live_app" if args.live_data else "benchmarks.loadtest:create_offline_app"
+    api_command = [
+        sys.executable, "-m", "uvicorn", app_target, "--factory", "--host", "127.0.0.1", "--port", str(api_port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    data_dir = tempfile.TemporaryDirectory(prefix="loadtest-cache-")
+    api_env = {
+        **os.environ, "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1", "OPENAI_API_KEY": "stub",
+        DATA_CACHE_ENV: data_dir.name,
+    }
+    # Without force_refresh every request after the first would be a result-cache hit
+    payload = {"ticker": args.ticker, "trade_date": args.trade_date, "force_refresh": not args.use_cache}
+    base_url = f"http://127.0.0.1:{api_port}"
+
+    results = []
+    with data_dir, _serve(stub_command, f"http://127.0.0.1:{stub_port}/openapi.json"), \
+            _serve(api_command, f"{base_url}/health", env=api_env):
+        # One warm-up request per worker so graph compilation is not counted against the first level
+        asyncio.run(drive(base_url, "/analyze", args.workers, args.workers, payload, args.timeout))
+        for concurrency in args.concurrency:
+            for endpoint in args.endpoints:
+                result = asyncio.run(drive(base_url, endpoint, concurrency, max(args.requests, concurrency), payload, args.timeout))
+                results.append(result)
+                print(f"{endpoint} @ {concurrency}: {result['throughput_rps']:.3f} req/s, p95 {_format(result['p95_s'])}s", flush=True)
+
+    print()
+    print_report(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
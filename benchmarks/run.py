@@ -0,0 +1,162 @@
+"""
+Offline benchmark suite for the trading graph.
+
+Runs the full graph with `benchmarks.fakes` standing in for the LLMs, yfinance, Finnhub, Tavily and
+the OpenAI embeddings, so every number measures this codebase's own overhead:
+
+- per-node overhead (mean seconds per node execution, from the per-run timing breakdown),
+- end-to-end runs/sec with zero LLM latency,
+- graph state size per step (pickled bytes of the state after each super-step),
+- `get_memories` latency (p50/p95) at several collection sizes.
+
+Results are compared with the `offline` section of `benchmarks/thresholds.json`; any regression is
+listed and the process exits with code 1.
+
+Usage:
+    python -m benchmarks.run
+    python -m benchmarks.run --runs 20 --memory-sizes 100 1000 10000 --json results.json
+"""
+import argparse
+import json
+import pickle
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.fakes import EMBEDDING_DIM, offline_environment
+from benchmarks.import_time import load_thresholds
+
+TICKER = "NVDA"
+TRADE_DATE = "2025-01-02"
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def bench_graph(runs):
+    """End-to-end runs/sec, per-node overhead and per-step state size for the default graph."""
+    from building_graph import build_graph_input, create_trading_graph
+    from config.configurable import config
+    from utility.instrumentation import track_run
+
+    graph = create_trading_graph(config)
+    # Warm-up run: first-call costs (tool schema conversion, Chroma collection load) are not overhead per run
+    graph.invoke(build_graph_input(TICKER, TRADE_DATE), config={"recursion_limit": config["max_recur_limit"]})
+
+    node_seconds = {}
+    started = time.perf_counter()
+    for _ in range(runs):
+        analysis_id = uuid.uuid4().hex
+        graph_config = {"recursion_limit": config["max_recur_limit"], "metadata": {"priority": "batch", "analysis_id": analysis_id}}
+        with track_run(analysis_id) as timings:
+            graph.invoke(build_graph_input(TICKER, TRADE_DATE), config=graph_config)
+        for node_name, stat in timings.as_dict()["nodes"].items():
+            node_seconds.setdefault(node_name, []).append(stat["seconds"] / stat["calls"])
+    elapsed = time.perf_counter() - started
+
+    state_sizes = []
+    for state in graph.stream(build_graph_input(TICKER, TRADE_DATE), config={"recursion_limit": config["max_recur_limit"]}, stream_mode="values"):
+        state_sizes.append(len(pickle.dumps(state)))
+
+    return {
+        "runs": runs,
+        "runs_per_second": runs / elapsed,
+        "node_overhead_ms": {node: 1000 * statistics.mean(samples) for node, samples in node_seconds.items()},
+        "state_bytes": {"steps": len(state_sizes), "max": max(state_sizes), "final": state_sizes[-1]},
+    }
+
+
+def bench_memory(sizes, queries):
+    """`get_memories` latency after bulk-loading each collection size with stub embeddings."""
+    import numpy as np
+
+    import utility.memory as memory
+
+    results = {}
+    rng = np.random.default_rng(0)
+    for size in sizes:
+        mem = memory.get_memory(f"bench_memory_{size}")
+        collection = mem.situation_collection
+        # Bulk-load random unit vectors directly; embedding each situation would only measure the stub
+        for start in range(0, size, 5000):
+            count = min(5000, size - start)
+            vectors = rng.standard_normal((count, EMBEDDING_DIM)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            collection.add(
+                ids=[str(start + i) for i in range(count)],
+                embeddings=vectors,
+                documents=[f"situation {start + i}" for i in range(count)],
+                metadatas=[{"recommendation": f"advice {start + i}"} for i in range(count)],
+            )
+        samples = []
+        for i in range(queries):
+            situation = f"query situation {i}"
+            begin = time.perf_counter()
+            mem.get_memories(situation, n_matches=2)
+            samples.append(time.perf_counter() - begin)
+        results[str(size)] = {"p50_ms": 1000 * percentile(samples, 0.5), "p95_ms": 1000 * percentile(samples, 0.95)}
+    return results
+
+
+def check_thresholds(results, thresholds):
+    """Return a list of human-readable threshold violations."""
+    failures = []
+    graph = results["graph"]
+    if graph["runs_per_second"] < thresholds["min_runs_per_second"]:
+        failures.append(f"runs/sec {graph['runs_per_second']:.2f} < {thresholds['min_runs_per_second']}")
+    for node, ms in graph["node_overhead_ms"].items():
+        if ms > thresholds["max_node_overhead_ms"]:
+            failures.append(f"node overhead {node}: {ms:.2f}ms > {thresholds['max_node_overhead_ms']}ms")
+    if graph["state_bytes"]["max"] > thresholds["max_state_bytes"]:
+        failures.append(f"state size {graph['state_bytes']['max']}B > {thresholds['max_state_bytes']}B")
+    for size, stats in results["memory"].items():
+        budget = thresholds["max_memory_query_p95_ms"].get(size)
+        if budget is not None and stats["p95_ms"] > budget:
+            failures.append(f"get_memories p95 at {size}: {stats['p95_ms']:.2f}ms > {budget}ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="timed end-to-end graph runs")
+    parser.add_argument("--memory-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=50, help="get_memories calls per collection size")
+    parser.add_argument("--json", type=Path, help="also write the raw results to this file")
+    args = parser.parse_args(argv)
+
+    with offline_environment():
+        results = {"graph": bench_graph(args.runs), "memory": bench_memory(args.memory_sizes, args.queries)}
+
+    graph = results["graph"]
+    print(f"end-to-end: {graph['runs_per_second']:.2f} runs/sec over {graph['runs']} runs (zero LLM latency)")
+    print("per-node overhead:")
+    for node, ms in sorted(graph["node_overhead_ms"].items(), key=lambda item: -item[1]):
+        print(f"    {node:<24} {ms:8.2f} ms")
+    state = graph["state_bytes"]
+    print(f"state size: {state['steps']} steps, max {state['max']} B, final {state['final']} B")
+    print("get_memories latency:")
+    for size, stats in results["memory"].items():
+        print(f"    {size:>8} entries  p50 {stats['p50_ms']:7.2f} ms  p95 {stats['p95_ms']:7.2f} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+    failures = check_thresholds(results, load_thresholds()["offline"])
+    if failures:
+        print("Benchmark thresholds exceeded:")
+        for failure in failures:
+            print(f"    {failure}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Local OpenAI-compatible stub server for load tests.
+
+Serves `POST /v1/chat/completions` and `POST /v1/embeddings` with synthetic answers and
+configurable timing, so the API can be load-tested without a provider:
+
+- each chat completion waits for a latency sampled from `--latency` plus
+  `--completion-tokens / --tokens-per-second` (generation time at the configured token rate),
+- when tools are offered and the last message is not a tool result, every tool is called once
+  (arguments filled from the ticker/date in the prompt), otherwise a scripted answer is returned,
+- embeddings are deterministic unit vectors (float or base64 encoding, as the SDK requests).
+
+Latency distributions:
+    const:SECONDS            e.g. const:0.5
+    uniform:LOW,HIGH         e.g. uniform:0.2,1.5
+    exp:MEAN                 e.g. exp:0.8
+    lognormal:MEDIAN,SIGMA   e.g. lognormal:0.6,0.5
+
+Usage:
+    python -m benchmarks.stub_openai --port 9100 --latency lognormal:0.6,0.5 --tokens-per-second 80
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+from fastapi import FastAPI, Request
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.fakes import scripted_tool_args, stub_embedding
+
+SCRIPTED_REPLY = "Stubbed analysis of the provided reports. FINAL TRANSACTION PROPOSAL: **BUY**"
+
+
+def parse_distribution(spec):
+    """Return a zero-argument sampler (seconds) for a `kind:params` latency spec."""
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "const" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(*values)
+    if kind == "exp" and len(values) == 1:
+        return lambda: random.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    if kind == "lognormal" and len(values) == 2:
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unsupported latency distribution {spec!r}")
+
+
+def create_app(latency="const:0", tokens_per_second=0.0, completion_tokens=300):
+    """The stub app; `tokens_per_second=0` disables the generation-time component."""
+    sample_latency = parse_distribution(latency)
+    app = FastAPI(title="OpenAI-compatible stub")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        prompt_text = "\n".join(str(message.get("content") or "") for message in messages)
+        tools = body.get("tools") or []
+
+        if tools and messages and messages[-1].get("role") != "tool":
+            tool_calls = [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {
+                        "name": tool["function"]["name"],
+                        "arguments": json.dumps(scripted_tool_args(tool["function"]["parameters"].get("properties", {}), prompt_text)),
+                    },
+                }
+                for tool in tools
+            ]
+            message = {"role": "assistant", "content": None, "tool_calls": tool_calls}
+            finish_reason, generated = "tool_calls", 20 * len(tool_calls)
+        else:
+            message = {"role": "assistant", "content": SCRIPTED_REPLY}
+            finish_reason, generated = "stop", completion_tokens
+
+        delay = sample_latency() + (generated / tokens_per_second if tokens_per_second > 0 else 0.0)
+        await asyncio.sleep(delay)
+
+        prompt_tokens = len(prompt_text) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": generated, "total_tokens": prompt_tokens + generated},
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for index, text in enumerate(texts):
+            vector = stub_embedding(str(text))
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode()
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        tokens = sum(len(str(text)) // 4 for text in texts)
+        return {"object": "list", "data": data, "model": body.get("model", "stub"), "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="const:0", help="per-request latency distribution (see above)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="generation rate; 0 disables")
+    parser.add_argument("--completion-tokens", type=int, default=300, help="tokens in each text answer")
+    args = parser.parse_args(argv)
+
+    app = create_app(args.latency, args.tokens_per_second, args.completion_tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
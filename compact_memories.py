@@ -0,0 +1,324 @@
+"""
+Compaction of the agent memories (Chroma collections).
+
+`add_situation` only appends (or upserts by run), so collections keep growing and fill up with
+near-identical situations for the same ticker. Compaction, per collection:
+
+1. Merge near-duplicates: situations of the same ticker whose embeddings have cosine similarity
+   >= `memory_dedupe_similarity` are clustered around the newest entry. The newest entry is kept,
+   with up to `memory_merge_max_recommendations` distinct recommendations of the cluster and
+   `merged_count` recording how many entries it stands for; the rest are deleted.
+2. Enforce the capacity cap: if more than `memory_max_entries` remain, the lowest-scoring entries
+   are evicted. The score blends recency (halving every `memory_recency_half_life_days`, from the
+   trade date) and usefulness (how many situations an entry stands for and how large the realized
+   move behind its lesson was), weighted by `memory_eviction_weights`.
+3. Rebuild: the survivors are written to a fresh collection that replaces the old one. Deleting in
+   place leaves tombstones in Chroma's HNSW index, and queries on it stay slower than on a freshly
+   built index of the same size. Processes holding the old collection reopen it by name on their
+   next memory call. The new collection is filled under `<name>-compacting` and renamed; if a run
+   dies before the rename, the next compaction restores it (see `restore_interrupted_rebuild`).
+4. Report entry counts, on-disk size and query latency before and after.
+
+Usage:
+    python compact_memories.py
+    python compact_memories.py --max-entries 500 --similarity 0.9 --dry-run
+    python reflect.py --compact   # compact after each reflection pass
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config
+
+_PAGE_SIZE = 5000
+# Separates the recommendations folded into a merged entry (lessons themselves may span several lines)
+RECOMMENDATION_SEPARATOR = "\n---\n"
+
+
+def load_entries(collection):
+    """All entries of a collection as `(ids, documents, metadatas, embeddings)`."""
+    import numpy as np
+
+    ids, documents, metadatas, embeddings = [], [], [], []
+    for offset in range(0, collection.count(), _PAGE_SIZE):
+        page = collection.get(include=["documents", "metadatas", "embeddings"], limit=_PAGE_SIZE, offset=offset)
+        ids += page["ids"]
+        documents += page["documents"]
+        metadatas += [meta or {} for meta in page["metadatas"]]
+        embeddings += list(page["embeddings"])
+    return ids, documents, metadatas, np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+
+
+def _entry_time(meta):
+    """Timestamp an entry is aged from: its trade date, else when it was added (0 for legacy entries)."""
+    if meta.get("trade_date"):
+        return datetime.datetime.fromisoformat(meta["trade_date"]).timestamp()
+    return float(meta.get("added_at", 0.0))
+
+
+def _split_recommendations(text):
+    return [part.strip() for part in text.split(RECOMMENDATION_SEPARATOR) if part.strip()]
+
+
+def near_duplicate_clusters(metadatas, vectors, similarity):
+    """
+    Greedy clusters of indices: within each ticker, the newest unassigned entry absorbs every
+    unassigned entry at or above `similarity`. Singletons are not returned.
+    """
+    import numpy as np
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1)
+    groups = {}
+    for index, meta in enumerate(metadatas):
+        groups.setdefault(meta.get("ticker", ""), []).append(index)
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        members = sorted(members, key=lambda index: _entry_time(metadatas[index]), reverse=True)
+        group_vectors = vectors[members]
+        unassigned = np.ones(len(members), dtype=bool)
+        for position in range(len(members)):
+            if not unassigned[position]:
+                continue
+            similar = unassigned & (group_vectors @ group_vectors[position] >= similarity)
+            similar[position] = True
+            unassigned &= ~similar
+            if similar.sum() > 1:
+                # Leader (newest) first
+                clusters.append([members[position]] + [members[other] for other in np.flatnonzero(similar) if other != position])
+    return clusters
+
+
+def merge_metadata(metadatas, cluster, max_recommendations):
+    """Metadata of a cluster's surviving (newest) entry after absorbing the others."""
+    recommendations = []
+    for index in cluster:
+        for recommendation in _split_recommendations(metadatas[index].get("recommendation", "")):
+            if recommendation not in recommendations:
+                recommendations.append(recommendation)
+    merged = {
+        **metadatas[cluster[0]],
+        "recommendation": RECOMMENDATION_SEPARATOR.join(recommendations[:max_recommendations]),
+        "merged_count": sum(int(metadatas[index].get("merged_count", 1)) for index in cluster),
+    }
+    # The merged lessons are only known once the latest of their outcomes is (never, for undated ones)
+    outcome_days = [metadatas[index].get("outcome_day") for index in cluster]
+    if None in outcome_days:
+        merged.pop("outcome_day", None)
+    else:
+        merged["outcome_day"] = max(outcome_days)
+    return merged
+
+
+def eviction_scores(metadatas, now=None, half_life_days=None, weights=None):
+    """Keep-score per entry in [0, 1]; the lowest scores are evicted first."""
+    import numpy as np
+
+    now = now or time.time()
+    half_life_days = config["memory_recency_half_life_days"] if half_life_days is None else half_life_days
+    weights = config["memory_eviction_weights"] if weights is None else weights
+    age_days = np.array([max(now - _entry_time(meta), 0.0) / 86400 for meta in metadatas])
+    recency = 0.5 ** (age_days / half_life_days)
+
+    def percentile_rank(values):
+        values = np.asarray(values, dtype=float)
+        return values.argsort(kind="stable").argsort(kind="stable") / max(len(values) - 1, 1)
+
+    support = percentile_rank([int(meta.get("merged_count", 1)) for meta in metadatas])
+    move = percentile_rank([abs(float(meta.get("realized_return", 0.0))) for meta in metadatas])
+    usefulness = (support + move) / 2
+    return weights["recency"] * recency + weights["usefulness"] * usefulness
+
+
+def query_latency(collection, vectors, queries=50, n_results=1):
+    """p50/p95 of nearest-neighbour queries (stored embeddings as queries, so no embedding calls)."""
+    import numpy as np
+
+    if collection.count() == 0 or len(vectors) == 0:
+        return {"p50_ms": None, "p95_ms": None}
+    rng = np.random.default_rng(0)
+    samples = []
+    for index in rng.integers(0, len(vectors), queries):
+        begin = time.perf_counter()
+        collection.query(query_embeddings=[vectors[index]], n_results=min(n_results, collection.count()), include=["metadatas"])
+        samples.append(time.perf_counter() - begin)
+    return {"p50_ms": 1000 * float(np.percentile(samples, 50)), "p95_ms": 1000 * float(np.percentile(samples, 95))}
+
+
+def restore_interrupted_rebuild(memory):
+    """
+    Finish a rebuild that died before renaming `<name>-compacting` into place. The staging collection
+    holds compacted entries under their original ids, so upserting whatever `<name>` holds (all entries
+    if the crash came before the old collection was deleted, or what was written to a recreated
+    `<name>` since) and then swapping loses nothing. Returns True if a rebuild was restored.
+    """
+    client, name = memory.chroma_client, memory.name
+    staging_name = f"{name}-compacting"
+    names = [collection.name for collection in client.list_collections()]
+    if staging_name not in names:
+        return False
+    staging = client.get_collection(staging_name)
+    if name in names:
+        ids, documents, metadatas, vectors = load_entries(client.get_collection(name))
+        for offset in range(0, len(ids), _PAGE_SIZE):
+            page = slice(offset, offset + _PAGE_SIZE)
+            staging.upsert(ids=ids[page], documents=documents[page], metadatas=metadatas[page], embeddings=vectors[page])
+        client.delete_collection(name)
+    staging.modify(name=name)
+    memory.situation_collection = staging
+    return True
+
+
+def rebuild_collection(memory, ids, documents, metadatas, embeddings):
+    """
+    Replace the memory's collection with a freshly indexed one holding only the given entries. Call
+    `restore_interrupted_rebuild` first: a left-over staging collection may hold the only copy.
+    """
+    client, name = memory.chroma_client, memory.name
+    staging = client.create_collection(f"{name}-compacting", metadata=memory.situation_collection.metadata)
+    for offset in range(0, len(ids), _PAGE_SIZE):
+        page = slice(offset, offset + _PAGE_SIZE)
+        staging.add(ids=ids[page], documents=documents[page], metadatas=metadatas[page], embeddings=embeddings[page])
+    client.delete_collection(name)
+    staging.modify(name=name)
+    memory.situation_collection = staging
+    return staging
+
+
+def compact_memory(memory, max_entries=None, similarity=None, max_recommendations=None, dry_run=False, queries=50):
+    """Merge near-duplicates, enforce the cap, rebuild and return a before/after report for one memory."""
+    import numpy as np
+
+    max_entries = config["memory_max_entries"] if max_entries is None else max_entries
+    similarity = config["memory_dedupe_similarity"] if similarity is None else similarity
+    if max_recommendations is None:
+        max_recommendations = config["memory_merge_max_recommendations"]
+
+    if not dry_run:
+        restore_interrupted_rebuild(memory)
+    collection = memory.situation_collection
+    ids, documents, metadatas, vectors = load_entries(collection)
+    report = {"entries_before": len(ids), "latency_before": query_latency(collection, vectors, queries)}
+
+    clusters = near_duplicate_clusters(metadatas, vectors, similarity)
+    merged_away = {index for cluster in clusters for index in cluster[1:]}
+    merged_metadata = {cluster[0]: merge_metadata(metadatas, cluster, max_recommendations) for cluster in clusters}
+
+    survivors = np.array([index for index in range(len(ids)) if index not in merged_away], dtype=int)
+    evicted = []
+    if len(survivors) > max_entries:
+        scores = eviction_scores([merged_metadata.get(index, metadatas[index]) for index in survivors])
+        order = np.argsort(scores, kind="stable")
+        evicted = survivors[order[:len(survivors) - max_entries]].tolist()
+    evicted_set = set(evicted)
+    report.update(clusters=len(clusters), merged=len(merged_away), evicted=len(evicted))
+
+    kept = np.array([index for index in range(len(ids)) if index not in merged_away and index not in evicted_set], dtype=int)
+    if dry_run:
+        report.update(entries_after=len(kept), latency_after=None)
+        return report
+    if len(kept) < len(ids):
+        collection = rebuild_collection(
+            memory,
+            [ids[index] for index in kept],
+            [documents[index] for index in kept],
+            [merged_metadata.get(index, metadatas[index]) for index in kept],
+            vectors[kept],
+        )
+    report.update(entries_after=collection.count(), latency_after=query_latency(collection, vectors[kept], queries))
+    return report
+
+
+def _directory_bytes(path):
+    return sum(file.stat().st_size for file in Path(path).rglob("*") if file.is_file())
+
+
+def prune_orphaned_segments(path):
+    """
+    Remove vector-index directories of collections that no longer exist (Chroma leaves them behind
+    when a collection is deleted). Returns the number of directories removed.
+    """
+    import shutil
+    import sqlite3
+    import uuid
+
+    database = Path(path) / "chroma.sqlite3"
+    if not database.exists():
+        return 0
+    with sqlite3.connect(database) as conn:
+        live = {row[0] for row in conn.execute("SELECT id FROM segments")}
+    removed = 0
+    for directory in Path(path).iterdir():
+        try:
+            uuid.UUID(directory.name)
+        except ValueError:
+            continue
+        if directory.is_dir() and directory.name not in live:
+            shutil.rmtree(directory)
+            removed += 1
+    return removed
+
+
+def compact_memories(names=None, max_entries=None, similarity=None, dry_run=False, queries=50):
+    """Compact the named memories (default: all agent memories); returns the report."""
+    from utility.memory import MEMORY_NAMES, get_memory
+
+    names = names or MEMORY_NAMES
+    size_before = _directory_bytes(config["data_cache_dir"])
+    report = {"collections": {}}
+    for name in names:
+        report["collections"][name] = compact_memory(get_memory(name), max_entries, similarity, dry_run=dry_run, queries=queries)
+    if not dry_run:
+        report["pruned_segments"] = prune_orphaned_segments(config["data_cache_dir"])
+    # Chroma shares one storage directory across collections; its SQLite file only shrinks on `chroma vacuum`
+    report["disk_bytes_before"] = size_before
+    report["disk_bytes_after"] = _directory_bytes(config["data_cache_dir"])
+    return report
+
+
+def print_report(report):
+    def ms(value):
+        return "-" if value is None else f"{value:.2f}"
+
+    header = f"{'memory':<22} {'before':>7} {'after':>7} {'merged':>7} {'evicted':>7} {'p50 ms':>14} {'p95 ms':>14}"
+    print(header)
+    print("-" * len(header))
+    for name, r in report["collections"].items():
+        after = r["latency_after"] or {"p50_ms": None, "p95_ms": None}
+        print(
+            f"{name:<22} {r['entries_before']:>7} {r['entries_after']:>7} {r['merged']:>7} {r['evicted']:>7} "
+            f"{ms(r['latency_before']['p50_ms']) + ' > ' + ms(after['p50_ms']):>14} "
+            f"{ms(r['latency_before']['p95_ms']) + ' > ' + ms(after['p95_ms']):>14}"
+        )
+    print(f"data_cache_dir size: {report['disk_bytes_before'] / 1e6:.1f} MB > {report['disk_bytes_after'] / 1e6:.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--memories", nargs="+", help="memory names (default: all agent memories)")
+    parser.add_argument("--max-entries", type=int, help=f"per-collection cap (default {config['memory_max_entries']})")
+    parser.add_argument("--similarity", type=float, help=f"merge threshold (default {config['memory_dedupe_similarity']})")
+    parser.add_argument("--queries", type=int, default=50, help="queries per latency measurement")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be merged/evicted without changing anything")
+    parser.add_argument("--json", type=Path, help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = compact_memories(args.memories, args.max_entries, args.similarity, args.dry_run, args.queries)
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,6 @@
 from pprint import pprint
+import hashlib
+import json
 import os
 
 # define our central config class for our app
@@ -9,16 +11,94 @@ config = {
     "llm_provider": "openai",
     "deep_think_llm": "gpt-4o",  # Powerful model for complex reasoning
     "quick_think_llm": "gpt-4o-mini", # Faster model for quick thinking
-    "backend_url": "https://api.openai.com/v1",
+    "backend_url": None, # Any OpenAI-compatible endpoint (e.g. the load-test stub); None = $OPENAI_BASE_URL or api.openai.com
     # Debate and Discussion Settings
     "max_debate_rounds": 2,
     "max_risk_discuss_rounds": 1, # Maximum number of rounds to discuss risks
     "max_recur_limit": 100,  # Maximum number of recursive calls for the graph
+    # Graph Settings
+    "analysts": ["market", "social", "news", "fundamentals"], # Analysts to run, in this order
+    "allowed_models": ["gpt-4o", "gpt-4o-mini"], # Models that API callers may select per request
+    "graph_cache_size": 8, # Compiled graph variants kept in the LRU cache
+    "api_worker_threads": 40, # Threads serving the blocking API endpoints (anyio's thread limiter), i.e. graph runs at once
     # Tool Settings
     "online_tools": True, # Use live APIs instead of cached data
     "data_cache_dir": "./data_cache",  # Directory for caching online data
+    "finnhub_news_page_size": 250, # Most articles Finnhub returns per company-news request; a full page was cut off
+    "corpus_search_lookback_days": 7, # Days of stored news searched when live web search is unavailable
+    # HTTP Settings (shared connection pools for all external providers)
+    "http_pool_connections": 10, # Keep-alive connections kept open per host
+    "http_pool_maxsize": 20, # Maximum concurrent connections per host
+    "http_keepalive_expiry": 30, # Seconds an idle keep-alive connection is kept
+    "http_timeout": 60, # Per-request timeout in seconds
+    "http_max_retries": 3, # Retries for transient 429/5xx/connection errors
+    "http_backoff_base": 0.5, # Base delay (seconds) for jittered exponential backoff
+    "http_backoff_max": 30.0, # Upper bound for a single backoff delay
+    "circuit_breaker_threshold": 5, # Consecutive failures before a provider's circuit opens
+    "circuit_breaker_reset_seconds": 30, # How long an open circuit short-circuits calls
+    # LLM Scheduler Settings (process-wide admission control for all chat-model calls)
+    "llm_rate_limits": { # Per-model provider limits: requests and tokens per minute
+        "gpt-4o": {"rpm": 500, "tpm": 30000},
+        "gpt-4o-mini": {"rpm": 500, "tpm": 200000},
+    },
+    "llm_default_rate_limit": {"rpm": 500, "tpm": 30000}, # Used for models not listed above
+    "llm_expected_completion_tokens": 800, # Completion size assumed before the real usage is known
+    # Deadline Settings (per-node LLM deadlines and hedged requests)
+    "llm_request_timeout": 120, # Timeout for a single chat-model request (seconds)
+    "node_deadlines": { # Per-node LLM deadline (seconds) before falling back to the quick model
+        "Research Manager": 90,
+        "Risk Judge": 90,
+    },
+    "default_node_deadline": 120, # Deadline for nodes not listed above
+    "fallback_deadline_share": 0.25, # Part of a node's deadline kept for the fallback model
+    "hedge_enabled": True, # Fire a duplicate request when a call is slower than the node's usual latency
+    "hedge_quantile": 0.95, # Latency quantile after which the duplicate request is fired
+    "hedge_min_samples": 20, # Samples needed before the quantile is trusted
+    "hedge_default_delay": 30, # Hedge delay (seconds) used until enough samples exist
+    "deadline_max_workers": None, # Worker threads running deadline-bounded LLM calls; None = 3 per concurrent graph run
+    # Result Cache Settings (finished /analyze results, keyed by ticker, trade date and config hash)
+    "result_cache_enabled": True, # Serve repeat analyses from data_cache_dir/results.sqlite
+    "result_cache_ttl_seconds": 900, # Reuse window for analyses of today's date; past dates never expire
+    # Screener Settings (vectorized pre-screen before the graph, see utility/screener.py)
+    "screener_top_n": 10, # Tickers passed from the screen into the trading graph
+    "screener_lookback_days": 180, # Calendar days of closes stacked into the price matrix
+    "screener_momentum_window": 63, # Trading days for the momentum return (~3 months)
+    "screener_breakout_window": 20, # Bollinger window for the volatility-breakout z-score
+    "screener_rsi_window": 14, # Wilder RSI period
+    "screener_rsi_bounds": [30, 70], # RSI below/above these counts as an extreme
+    "screener_weights": {"momentum": 1.0, "breakout": 1.0, "rsi": 1.0}, # Weight of each rule's z-score
+    "screener_max_parallel_runs": 2, # Graph runs in flight when the screen hands its top N to the graph
+    "screener_api_max_analyses": 3, # Top tickers POST /screen analyzes within the request; the rest are listed for /analyze
+    # Backtest Settings (see backtest.py)
+    "backtest_max_workers": 4, # Graph runs executed in parallel (one process each)
+    "backtest_llm_concurrency": 8, # In-flight LLM requests across all backtest processes
+    "backtest_horizons": [1, 5, 21], # Forward-return horizons in trading days
+    "backtest_lookback_days": 400, # Price history cached before the first trade date (200-day SMA needs ~300)
+    # Memory Settings
+    "embedding_batch_size": 256, # Texts per embeddings request when memories are written in bulk
+    "memory_max_entries": 2000, # Per-collection cap enforced by compaction (lowest-scoring entries are evicted)
+    "memory_dedupe_similarity": 0.95, # Cosine similarity at which situations of the same ticker are merged
+    "memory_merge_max_recommendations": 3, # Distinct recommendations kept on a merged entry
+    "memory_recency_half_life_days": 180, # Age at which an entry's recency weight halves
+    "memory_eviction_weights": {"recency": 0.5, "usefulness": 0.5}, # Blend of the eviction score
+    # Reflection Settings (outcome-driven lessons written to the agent memories, see reflect.py)
+    "reflection_horizon_days": 5, # Trading days after the trade date used as the realized outcome
+    "reflection_batch_size": 20, # Completed runs reflected (and written to memory) per batch
+    "reflection_llm_concurrency": 8, # Lesson-generation requests in flight within a batch
+    "reflection_interval_seconds": 86400, # Pause between passes when reflect.py runs with --loop
 }
 
-# create the cache directory if it doesn't exist
-os.makedirs(config["data_cache_dir"], exist_ok=True)
+# Keys that change the compiled graph; per-request variants are cached by a hash of these
+GRAPH_CONFIG_KEYS = ("deep_think_llm", "quick_think_llm", "max_debate_rounds", "max_risk_discuss_rounds", "analysts")
+
+
+def config_hash(config=config, keys=GRAPH_CONFIG_KEYS):
+    """Stable short hash of the config values in `keys`."""
+    payload = json.dumps({key: config[key] for key in keys}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def ensure_dirs(config=config):
+    """Create the cache directory if it doesn't exist (called on first use, not at import time)."""
+    os.makedirs(config["data_cache_dir"], exist_ok=True)
 
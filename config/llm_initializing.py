@@ -1,34 +1,51 @@
-from langchain_openai import ChatOpenAI
 from .configurable import config
+import functools
 import os
 from dotenv import load_dotenv
 
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError(
-        "OPENAI_API_KEY is not set. Please add it to your environment or a .env file "
-        "in the project root before running the application."
+def get_openai_api_key():
+    load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError(
+            "OPENAI_API_KEY is not set. Please add it to your environment or a .env file "
+            "in the project root before running the application."
+        )
+    return api_key
+
+
+def get_backend_url():
+    """The OpenAI-compatible endpoint: `config["backend_url"]`, else $OPENAI_BASE_URL (.env included)."""
+    if config["backend_url"]:
+        return config["backend_url"]
+    load_dotenv()
+    return os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+
+
+# Models are built on first use and memoized per model name, so importing this module
+# neither needs an API key nor pays the langchain_openai import.
+@functools.lru_cache(maxsize=None)
+def get_chat_model(model_name):
+    from utility.http_pool import get_openai_http_client
+    from utility.llm_scheduler import ScheduledChatOpenAI
+
+    return ScheduledChatOpenAI(
+        model=model_name,
+        base_url=get_backend_url(),
+        api_key=get_openai_api_key(),
+        temperature=0.1,
+        http_client=get_openai_http_client(),
+        max_retries=config["http_max_retries"],
+        timeout=config["llm_request_timeout"],
     )
 
+
 # Deep Think LLM
-deep_think_llm = ChatOpenAI(
-    model=config["deep_think_llm"],
-    base_url=config["backend_url"],
-    api_key=OPENAI_API_KEY,
-    temperature=0.1,
-)
+def get_deep_think_llm():
+    return get_chat_model(config["deep_think_llm"])
+
 
 # Quick Think LLM
-quick_think_llm = ChatOpenAI(
-    model=config["quick_think_llm"],
-    base_url=config["backend_url"],
-    api_key=OPENAI_API_KEY,
-    temperature=0.1,
-)
-
-print("LLMs Initialized Successfully:")
-print("--------------------------------")
-print(f"Deep Think LLM: {deep_think_llm}")
-print(f"Quick Think LLM: {quick_think_llm}")
\ No newline at end of file
+def get_quick_think_llm():
+    return get_chat_model(config["quick_think_llm"])
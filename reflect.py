@@ -0,0 +1,292 @@
+"""
+Outcome-driven reflection: turn completed analyses into lessons in the agent memories.
+
+Runs as a batch job, off the request path:
+
+1. Completed runs are read from the result store (`data_cache/results.sqlite`, written by
+   `/analyze`, `/analyze/stream` and `/screen`). Only production runs are used: ones made against
+   this process's model endpoint with `online_tools` on (load tests against a stub server or
+   cache-only runs are skipped, as are entries stored without provenance). Runs already reflected
+   are recorded in `data_cache/reflections.sqlite` and skipped, as are runs whose final decision has
+   no BUY/SELL/HOLD verdict to judge.
+2. The realized outcome of each run is the return from the trade date's close to the close
+   `reflection_horizon_days` trading days later, from the local price cache (missing history is
+   downloaded in batched requests when `online_tools` is on). Runs whose horizon has not elapsed yet
+   are left for a later pass.
+3. For every run, one lesson per role (bull, bear, research manager, trader, portfolio manager) is
+   generated with the quick model; all prompts of a batch go out together through `llm.batch` at
+   `batch` priority.
+4. The situation texts of a batch are embedded in one request and the lessons are upserted into the
+   five memories, keyed by the run, so re-running never duplicates entries.
+
+Usage:
+    python reflect.py
+    python reflect.py --horizon 21 --limit 200
+    python reflect.py --loop            # run every `reflection_interval_seconds`
+    python reflect.py --loop --compact  # and compact the memories after each pass (compact_memories.py)
+    # or from cron:  0 6 * * 1-5  cd /path/to/repo && python reflect.py
+"""
+import argparse
+import datetime
+import json
+import sqlite3
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Ensure project root is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config, ensure_dirs
+
+# Memory -> the role whose lesson it stores
+ROLES = {
+    "bull_memory": "the Bull Analyst, who argues the case for investing",
+    "bear_memory": "the Bear Analyst, who argues the case against investing",
+    "invest_judge_memory": "the Research Manager, who judges the bull/bear debate and writes the investment plan",
+    "trader_memory": "the Trader, who turns the investment plan into a BUY/HOLD/SELL proposal",
+    "risk_manager_memory": "the Portfolio Manager, who makes the final, risk-adjusted decision",
+}
+
+_LESSON_PROMPT = """You are reviewing a past trading analysis for {role}.
+
+Ticker: {ticker}, trade date: {trade_date}.
+{situation}
+
+Investment plan: {investment_plan}
+Final decision: {final_trade_decision}
+
+Outcome: {outcome}
+
+Write a lesson of at most four sentences for {role} to recall the next time a similar situation comes up:
+which signals in the reports turned out to matter for this outcome, what was over- or under-weighted,
+and what to do differently (or again). Answer with the lesson only."""
+
+
+class ReflectionLedger:
+    """Which result-store entries have already been written to the memories."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(str(path), timeout=30)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS reflections ("
+                "key TEXT PRIMARY KEY, ticker TEXT NOT NULL, trade_date TEXT NOT NULL, "
+                "decision TEXT NOT NULL, realized_return REAL NOT NULL, reflected_at REAL NOT NULL)"
+            )
+
+    def reflected(self):
+        return {row[0] for row in self.conn.execute("SELECT key FROM reflections")}
+
+    def mark(self, runs):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO reflections (key, ticker, trade_date, decision, realized_return, reflected_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(run["key"], run["ticker"], run["trade_date"], run["decision"], run["realized_return"], time.time()) for run in runs],
+            )
+
+
+def is_production(provenance):
+    """Whether a stored run was made against the configured model endpoint with live data."""
+    from config.llm_initializing import get_backend_url
+
+    return bool(provenance) and provenance.get("backend_url") == get_backend_url() and bool(provenance.get("online_tools"))
+
+
+def pending_runs(store, ledger, limit=None):
+    """
+    Completed, not yet reflected production runs with a parseable decision, as dicts with `key`, `ticker`,
+    `trade_date`, `decision` and `payload`.
+    """
+    from backtest import extract_decision
+
+    reflected = ledger.reflected()
+    runs = []
+    for key, trade_date, payload, provenance in store.completed(datetime.date.today().isoformat()):
+        if key in reflected or not is_production(provenance):
+            continue
+        decision = extract_decision(payload.get("final_trade_decision"))
+        if not decision:
+            # Without a verdict the outcome cannot say whether the call was right
+            continue
+        runs.append({
+            "key": key, "ticker": payload["ticker"].upper(), "trade_date": trade_date, "decision": decision, "payload": payload,
+        })
+        if limit and len(runs) >= limit:
+            break
+    return runs
+
+
+def outcome_date(prices, trade_date, horizon):
+    """Date of the close `horizon` sessions after the trade date's entry close (as in `add_forward_returns`)."""
+    import pandas as pd
+
+    exit_ = prices.index.searchsorted(pd.Timestamp(trade_date)) + horizon
+    return prices.index[exit_].strftime("%Y-%m-%d")
+
+
+def add_outcomes(runs, horizon, fetch=None):
+    """
+    Attach `realized_return` and `outcome_date` (when the return became known); returns only the runs
+    whose horizon is in the price cache.
+    """
+    import pandas as pd
+
+    from backtest import add_forward_returns
+    from utility.market_data import load_cached_prices, update_price_caches
+
+    if not runs:
+        return []
+    fetch = config["online_tools"] if fetch is None else fetch
+    if fetch:
+        update_price_caches(
+            sorted({run["ticker"] for run in runs}), min(run["trade_date"] for run in runs), datetime.date.today().isoformat()
+        )
+    frame = pd.DataFrame({
+        "ticker": [run["ticker"] for run in runs],
+        "trade_date": [run["trade_date"] for run in runs],
+        "decision": [run["decision"] for run in runs],
+    })
+    frame = add_forward_returns(frame, [horizon])
+    ready = []
+    for run, row in zip(runs, frame.itertuples(index=False)):
+        realized = getattr(row, f"fwd_return_{horizon}d")
+        if pd.isna(realized):
+            continue
+        ready.append({
+            **run, "realized_return": float(realized),
+            "outcome_date": outcome_date(load_cached_prices(run["ticker"]), run["trade_date"], horizon),
+        })
+    return ready
+
+
+def describe_outcome(decision, realized_return, horizon):
+    move = f"the stock returned {realized_return:+.2%} over the next {horizon} trading days"
+    if decision == "BUY":
+        verdict = "right" if realized_return > 0 else "wrong"
+    elif decision == "SELL":
+        verdict = "right" if realized_return < 0 else "wrong"
+    else:
+        return f"The decision was {decision}; {move}."
+    return f"The decision was {decision}; {move}, so the call was {verdict}."
+
+
+def lesson_prompts(run, horizon):
+    """One prompt per memory for a run, in `ROLES` order."""
+    from utility.memory import format_situation
+
+    payload = run["payload"]
+    situation = format_situation(
+        payload["market_report"], payload["sentiment_report"], payload["news_report"], payload["fundamentals_report"]
+    )
+    outcome = describe_outcome(run["decision"], run["realized_return"], horizon)
+    return situation, [
+        _LESSON_PROMPT.format(
+            role=role, ticker=run["ticker"], trade_date=run["trade_date"], situation=situation,
+            investment_plan=payload["investment_plan"], final_trade_decision=payload["final_trade_decision"], outcome=outcome,
+        )
+        for role in ROLES.values()
+    ]
+
+
+def reflect_batch(runs, horizon, llm, llm_concurrency):
+    """Generate the lessons for a batch of runs and upsert them into the memories; returns the runs written."""
+    from utility.memory import get_memory, outcome_day
+
+    situations, prompts = [], []
+    for run in runs:
+        situation, run_prompts = lesson_prompts(run, horizon)
+        situations.append(situation)
+        prompts += run_prompts
+    run_config = {
+        "max_concurrency": llm_concurrency,
+        "metadata": {"priority": "batch", "analysis_id": f"reflect-{uuid.uuid4().hex}"},
+    }
+    responses = llm.batch(prompts, config=run_config, return_exceptions=True)
+
+    # A run is written only when every role's lesson succeeded, so it is retried as a whole otherwise
+    lessons, written, written_situations = [], [], []
+    for index, run in enumerate(runs):
+        run_responses = responses[index * len(ROLES):(index + 1) * len(ROLES)]
+        if any(isinstance(response, Exception) for response in run_responses):
+            continue
+        lessons.append([response.content.strip() for response in run_responses])
+        written.append(run)
+        written_situations.append(situations[index])
+    if not written:
+        return []
+
+    # The situation text is the same for every role, so each is embedded once for all five memories
+    embeddings = get_memory("bull_memory").get_embeddings(written_situations)
+    added_at = time.time()
+    metadatas = [
+        {
+            "ticker": run["ticker"], "trade_date": run["trade_date"], "decision": run["decision"],
+            "realized_return": run["realized_return"], "horizon_days": horizon, "added_at": added_at,
+            "outcome_day": outcome_day(run["outcome_date"]),
+        }
+        for run in written
+    ]
+    for role_index, name in enumerate(ROLES):
+        get_memory(name).add_situation(
+            [(situation, run_lessons[role_index]) for situation, run_lessons in zip(written_situations, lessons)],
+            ids=[run["key"] for run in written],
+            metadatas=metadatas,
+            embeddings=embeddings,
+        )
+    return written
+
+
+def reflect(horizon=None, limit=None, batch_size=None, llm_concurrency=None, fetch=None):
+    """One reflection pass over the result store; returns counts of pending, ready and written runs."""
+    from config.llm_initializing import get_quick_think_llm
+    from utility.result_store import get_result_store
+
+    horizon = config["reflection_horizon_days"] if horizon is None else horizon
+    batch_size = config["reflection_batch_size"] if batch_size is None else batch_size
+    llm_concurrency = config["reflection_llm_concurrency"] if llm_concurrency is None else llm_concurrency
+    ensure_dirs(config)
+    ledger = ReflectionLedger(Path(config["data_cache_dir"]) / "reflections.sqlite")
+
+    runs = pending_runs(get_result_store(), ledger, limit)
+    ready = add_outcomes(runs, horizon, fetch)
+    llm = get_quick_think_llm()
+    written = 0
+    for offset in range(0, len(ready), batch_size):
+        batch = reflect_batch(ready[offset:offset + batch_size], horizon, llm, llm_concurrency)
+        ledger.mark(batch)
+        written += len(batch)
+    return {"pending": len(runs), "ready": len(ready), "written": written}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--horizon", type=int, help=f"trading days to the realized outcome (default {config['reflection_horizon_days']})")
+    parser.add_argument("--limit", type=int, help="reflect at most this many runs per pass")
+    parser.add_argument("--batch-size", type=int, help=f"runs per LLM/embedding batch (default {config['reflection_batch_size']})")
+    parser.add_argument("--llm-concurrency", type=int, help=f"lesson requests in flight (default {config['reflection_llm_concurrency']})")
+    parser.add_argument("--no-fetch", action="store_true", help="use the price cache as is (no downloads)")
+    parser.add_argument("--loop", action="store_true", help="repeat every `reflection_interval_seconds`")
+    parser.add_argument("--compact", action="store_true", help="merge near-duplicates and enforce the memory cap after each pass")
+    args = parser.parse_args(argv)
+
+    while True:
+        result = reflect(
+            args.horizon, args.limit, args.batch_size, args.llm_concurrency, fetch=False if args.no_fetch else None,
+        )
+        print(json.dumps({"at": datetime.datetime.now().isoformat(timespec="seconds"), **result}), flush=True)
+        if args.compact:
+            from compact_memories import compact_memories, print_report
+
+            print_report(compact_memories())
+        if not args.loop:
+            return 0
+        time.sleep(config["reflection_interval_seconds"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Pre-screen a ticker universe and run only the top N through the trading graph.
+
+The screener (`utility.screener`) ranks the whole universe with vectorized momentum, volatility
+breakout and RSI-extreme rules over the cached price matrix; no LLM is called for that step. With
+`--analyze`, the top N tickers are then analyzed by the graph, `screener_max_parallel_runs` at a time,
+as `batch` priority runs.
+
+Usage:
+    python screen.py --tickers NVDA AAPL MSFT AMZN META GOOGL TSLA --top 3
+    python screen.py --universe sp500.txt --top 10 --analyze
+    python screen.py --universe sp500.txt --as-of 2025-01-02 --no-fetch --analyze --trade-date 2025-01-02
+"""
+import argparse
+import concurrent.futures
+import json
+import sys
+import uuid
+from pathlib import Path
+
+# Ensure project root is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config
+
+
+def read_universe(path):
+    """Tickers from a file: one per line or comma/whitespace separated; `#` starts a comment."""
+    tickers = []
+    for line in Path(path).read_text().splitlines():
+        tickers += line.split("#", 1)[0].replace(",", " ").split()
+    return tickers
+
+
+def analyze(ticker, trade_date, as_of=None):
+    """Run the graph for one screened ticker and return its decision row."""
+    from backtest import extract_decision
+    from building_graph import build_graph_input, build_trading_graph
+
+    metadata = {"priority": "batch", "analysis_id": uuid.uuid4().hex}
+    if as_of:
+        # Screening was point-in-time, so the analysis must not see later data either
+        metadata["as_of"] = as_of
+    row = {"ticker": ticker, "trade_date": trade_date, "decision": "", "error": ""}
+    try:
+        state = build_trading_graph(config).invoke(
+            build_graph_input(ticker, trade_date),
+            config={"recursion_limit": config["max_recur_limit"], "metadata": metadata},
+        )
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+        return row
+    row["decision"] = extract_decision(state.get("final_trade_decision", "")) or extract_decision(state.get("trader_investment_plan", ""))
+    return row
+
+
+def main(argv=None):
+    import datetime
+
+    from utility.screener import screen
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    universe = parser.add_mutually_exclusive_group(required=True)
+    universe.add_argument("--tickers", nargs="+")
+    universe.add_argument("--universe", type=Path, help="file with the ticker universe")
+    parser.add_argument("--top", type=int, help=f"tickers to keep (default {config['screener_top_n']})")
+    parser.add_argument("--as-of", help="screen on data strictly before this date (default: today)")
+    parser.add_argument("--no-fetch", action="store_true", help="use the price cache as is (no downloads)")
+    parser.add_argument("--analyze", action="store_true", help="run the top N through the trading graph")
+    parser.add_argument("--trade-date", help="trade date for --analyze (default: the --as-of date, else 2 days ago as in the API)")
+    parser.add_argument("--workers", type=int, help=f"parallel graph runs (default {config['screener_max_parallel_runs']})")
+    args = parser.parse_args(argv)
+
+    tickers = args.tickers or read_universe(args.universe)
+    ranked = screen(tickers, as_of=args.as_of, top_n=args.top, fetch=False if args.no_fetch else None)
+    print(json.dumps(ranked, indent=2))
+    if not args.analyze or not ranked:
+        return 0
+
+    trade_date = args.trade_date or args.as_of or (datetime.date.today() - datetime.timedelta(days=2)).isoformat()
+    workers = args.workers or config["screener_max_parallel_runs"]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(lambda row: analyze(row["ticker"], trade_date, args.as_of), ranked))
+    for row in rows:
+        print(f"{row['ticker']:<8} {row['decision'] or '-':<5} {row['error']}")
+    return 1 if any(row["error"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,17 +28,20 @@ with st.sidebar:
         max_value=datetime.now().date(),
     )
     use_stream = st.checkbox("Stream from API", value=True, help="Use streaming endpoint (same loading experience)")
+    force_refresh = st.checkbox("Force refresh", value=False, help="Recompute instead of reusing a cached analysis")
 
     if st.button("Run Analysis", type="primary"):
         st.session_state["run_analysis"] = True
         st.session_state["ticker"] = ticker
         st.session_state["trade_date"] = trade_date.strftime("%Y-%m-%d")
         st.session_state["use_stream"] = use_stream
+        st.session_state["force_refresh"] = force_refresh
 
 if st.session_state.get("run_analysis"):
     ticker = st.session_state["ticker"]
     trade_date = st.session_state["trade_date"]
     use_stream = st.session_state.get("use_stream", False)
+    force_refresh = st.session_state.get("force_refresh", False)
 
     progress_placeholder = st.empty()
     result_placeholder = st.empty()
@@ -48,7 +51,7 @@ if st.session_state.get("run_analysis"):
             progress_placeholder.info("Loading.....")
             response = requests.post(
                 f"{API_BASE}/analyze/stream",
-                json={"ticker": ticker, "trade_date": trade_date},
+                json={"ticker": ticker, "trade_date": trade_date, "force_refresh": force_refresh},
                 stream=True,
                 timeout=600,
             )
@@ -84,7 +87,7 @@ if st.session_state.get("run_analysis"):
             progress_placeholder.info("Loading.....")
             response = requests.post(
                 f"{API_BASE}/analyze",
-                json={"ticker": ticker, "trade_date": trade_date},
+                json={"ticker": ticker, "trade_date": trade_date, "force_refresh": force_refresh},
                 timeout=600,
             )
             response.raise_for_status()
@@ -1,10 +1,11 @@
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import ToolMessage
+from utility.deadlines import DeadlineRunner
 
 
 # create a factor function that each analyst has its own role
 # This function is a factory that creates a LangGraph node for a specific type of analyst.
-def create_analyst_node(llm, toolkit, system_message, tools, output_field):
+def create_analyst_node(llm, toolkit, system_message, tools, output_field, node_name=None, fallback_llm=None):
     """
     Creates a node for an analyst agent.
     Args:
@@ -13,6 +14,8 @@ def create_analyst_node(llm, toolkit, system_message, tools, output_field):
         system_message: The specific instructions defining the agent's role and goals.
         tools: A list of specific tools from the toolkit that this agent is allowed to use.
         output_field: The key in the AgentState where this agent's final report will be stored.
+        node_name: The graph node name, used to look up the node's LLM deadline.
+        fallback_llm: The model answered with when the deadline is blown (defaults to `llm`).
     """
     # Define the prompt template for the analyst agent.
     prompt = ChatPromptTemplate.from_messages([
@@ -31,10 +34,12 @@ def create_analyst_node(llm, toolkit, system_message, tools, output_field):
     prompt = prompt.partial(tool_names=", ".join([tool.name for tool in tools]))
     # Bind the specified tools to the LLM. This tells the LLM which functions it can call.
     chain = prompt | llm.bind_tools(tools)
+    fallback_chain = prompt | (fallback_llm or llm).bind_tools(tools)
+    runner = DeadlineRunner(node_name or output_field, chain, fallback_chain)
     # This is the actual function that will be executed as a node in the graph.
     def analyst_node(state):
         # Call the LLM chain, not the bare prompt
-        result = chain.invoke({
+        result, call_path = runner.invoke({
         "messages": state["messages"],
         "current_date": state["trade_date"],
         "ticker": state["company_of_interest"],
@@ -45,5 +50,5 @@ def create_analyst_node(llm, toolkit, system_message, tools, output_field):
         if not getattr(result, "tool_calls", None):
             report = result.content
         # Return the LLM's response and the final report to update the state.
-        return {"messages": [result], output_field: report}
+        return {"messages": [result], output_field: report, "llm_call_paths": [call_path]}
     return analyst_node
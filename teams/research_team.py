@@ -7,20 +7,20 @@ from langchain_core.messages import HumanMessage
 import datetime
 from rich.console import Console
 from rich.markdown import Markdown
+from utility.deadlines import DeadlineRunner
+from utility.memory import format_situation
 
 
 
 
 
-def create_researcher_node(llm, memory,role_prompt, agent_name):
+def create_researcher_node(llm, memory,role_prompt, agent_name, node_name=None, fallback_llm=None):
+    runner = DeadlineRunner(node_name or agent_name, llm, fallback_llm)
     def researcher_node(state):
         # Cmobine the reports and debate history for context
-        situation_summary = f"""
-        Market Report: {state["market_report"]}
-        Sentiment Report: {state["sentiment_report"]}
-        News Report: {state["news_report"]}
-        Fundamental Report: {state["fundamental_report"]}
-        """
+        situation_summary = format_situation(
+            state["market_report"], state["sentiment_report"], state["news_report"], state["fundamental_report"]
+        )
         past_memories = memory.get_memories(situation_summary)
         past_memory_str = "\n".join([mem['recommendation'] for mem in past_memories])
 
@@ -32,7 +32,7 @@ def create_researcher_node(llm, memory,role_prompt, agent_name):
         Reflections from similar past situations: {past_memory_str or 'No past memories found.'}
         Based on all this information, present your argument conversationally."""
 
-        response = llm.invoke(prompt)
+        response, call_path = runner.invoke(prompt)
         argument = f"{agent_name}: {response.content}"
 
         # update the debate state
@@ -45,18 +45,19 @@ def create_researcher_node(llm, memory,role_prompt, agent_name):
             debate_state['bear_history'] += "\n" + argument
         debate_state['current_response'] = argument
         debate_state['count'] += 1
-        return {"investment_debate_state": debate_state}
+        return {"investment_debate_state": debate_state, "llm_call_paths": [call_path]}
     return researcher_node
     
 
-def create_research_manager(llm,memory):
+def create_research_manager(llm,memory, fallback_llm=None):
+    runner = DeadlineRunner("Research Manager", llm, fallback_llm)
     def research_manager_node(state):
         prompt = f"""As the Research Manager, your role is to critically evaluate the debate between the Bull and Bear analysts and make a definitive decision.
         Summarize the key points, then provide a clear recommendation: Buy, Sell, or Hold. Develop a detailed investment plan for the trader, including your rationale and strategic actions.
         
         Debate History:
         {state['investment_debate_state']['history']}"""
-        response = llm.invoke(prompt)
-        return {"investment_plan": response.content}
+        response, call_path = runner.invoke(prompt)
+        return {"investment_plan": response.content, "llm_call_paths": [call_path]}
     return research_manager_node
 
@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point `data_cache_dir` at a per-test directory."""
+    monkeypatch.setitem(config, "data_cache_dir", str(tmp_path / "data_cache"))
+    return tmp_path / "data_cache"
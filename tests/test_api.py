@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from utility.result_store import ResultStore
+
+
+class FakeGraph:
+    """Streams one node update per run and records how often it ran."""
+
+    def __init__(self, fallback=False):
+        self.runs = 0
+        self.fallback = fallback
+
+    def stream(self, graph_input, config):
+        self.runs += 1
+        time.sleep(0.2)
+        path = "fallback" if self.fallback else "primary"
+        yield {"Risk Judge": {"final_trade_decision": "FINAL TRANSACTION PROPOSAL: **HOLD**", "llm_call_paths": [{"node": "Risk Judge", "path": path}]}}
+
+    def invoke(self, graph_input, config):
+        state = dict(graph_input)
+        for chunk in self.stream(graph_input, config):
+            state.update(chunk["Risk Judge"])
+        return state
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = ResultStore(tmp_path / "results.sqlite", ttl_seconds=900)
+    graph = FakeGraph()
+    monkeypatch.setattr(api, "get_result_store", lambda: store)
+    monkeypatch.setattr(api, "build_trading_graph", lambda run_config: graph)
+    with TestClient(api.create_app()) as client:
+        client.graph, client.store = graph, store
+        yield client
+
+
+def _events(response):
+    return [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+
+def test_trade_dates_must_be_iso(client):
+    assert client.post("/analyze", json={"trade_date": "01/02/2025"}).status_code == 422
+    assert client.post("/analyze/stream", json={"trade_date": "2025-02-30"}).status_code == 422
+    assert client.post("/screen", json={"tickers": ["NVDA"], "as_of": "yesterday"}).status_code == 422
+
+
+def test_stream_and_analyze_share_the_cache(client):
+    first = client.post("/analyze/stream", json={"trade_date": "2025-01-02"})
+    assert first.headers["X-Cache"] == "MISS"
+    assert _events(first)[-1]["cached"] is False
+
+    cached = client.post("/analyze", json={"trade_date": "2025-01-02"})
+    assert cached.headers["X-Cache"] == "HIT"
+    etag = cached.headers["ETag"]
+    replay = client.post("/analyze/stream", json={"trade_date": "2025-01-02"})
+    assert (replay.headers["ETag"], _events(replay)[-1]["cached"]) == (etag, True)
+    not_modified = client.post("/analyze/stream", json={"trade_date": "2025-01-02"}, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert client.graph.runs == 1
+
+
+def test_concurrent_streams_run_the_graph_once(client):
+    responses = []
+
+    def request():
+        responses.append(client.post("/analyze/stream", json={"trade_date": "2025-01-03"}))
+
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert client.graph.runs == 1
+    assert sorted(_events(response)[-1]["cached"] for response in responses) == [False, True, True]
+
+
+def test_degraded_results_expire_like_todays(client):
+    client.graph.fallback = True
+    client.post("/analyze", json={"trade_date": "2025-01-02"})
+    key, trade_date, payload, _ = next(client.store.completed("2025-02-01"))
+    assert client.store.get(key) is not None
+    with client.store._connect() as conn:
+        conn.execute("UPDATE results SET created_at = created_at - 901")
+    assert client.store.get(key) is None
+    assert client.post("/analyze", json={"trade_date": "2025-01-02"}).headers["X-Cache"] == "MISS"
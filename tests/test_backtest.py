@@ -0,0 +1,44 @@
+from backtest import extract_decision
+
+
+def test_the_last_proposal_line_wins():
+    text = "Selling now would be premature.\nFINAL TRANSACTION PROPOSAL: **HOLD**\n...\nFINAL TRANSACTION PROPOSAL: **BUY**"
+    assert extract_decision(text) == "BUY"
+
+
+def test_bold_and_case_variants():
+    assert extract_decision("**FINAL TRANSACTION PROPOSAL: sell**") == "SELL"
+
+
+def test_free_text_is_not_a_decision():
+    assert extract_decision("We would buy more on a dip, but sell if guidance is cut.") == ""
+    assert extract_decision(None) == ""
+
+
+def test_portfolio_manager_verdicts():
+    # Shaped like Risk Judge answers from before its prompt asked for the proposal line
+    text = (
+        "**Final Decision: Hold**\n\n"
+        "**Justification:** The trader's plan to buy is premature. The risky analyst's case for upside "
+        "ignores the valuation concerns the safe analyst raised, so we should not sell either."
+    )
+    assert extract_decision(text) == "HOLD"
+    assert extract_decision("After weighing the debate, my recommendation - **SELL**. The downside risks dominate.") == "SELL"
+
+
+def test_portfolio_manager_prompt_asks_for_the_proposal_line():
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+
+    from teams.risk_team import create_risk_manager
+
+    prompts = []
+
+    def judge(prompt):
+        prompts.append(prompt)
+        return AIMessage(content="Hold: the upside is priced in.\n\nFINAL TRANSACTION PROPOSAL: **HOLD**")
+
+    node = create_risk_manager(RunnableLambda(judge), memory=None)
+    state = node({"trader_investment_plan": "FINAL TRANSACTION PROPOSAL: **BUY**", "risk_debate_state": {"history": ""}})
+    assert "FINAL TRANSACTION PROPOSAL: **BUY/HOLD/SELL**" in prompts[0]
+    assert extract_decision(state["final_trade_decision"]) == "HOLD"
@@ -0,0 +1,126 @@
+import time
+
+import numpy as np
+import pytest
+
+import compact_memories
+from compact_memories import (
+    RECOMMENDATION_SEPARATOR, compact_memory, eviction_scores, load_entries, merge_metadata, near_duplicate_clusters,
+    restore_interrupted_rebuild,
+)
+
+DAY = 86400
+
+
+def _unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_near_duplicates_cluster_around_the_newest_entry():
+    metadatas = [
+        {"ticker": "NVDA", "trade_date": "2025-01-02"},
+        {"ticker": "NVDA", "trade_date": "2025-01-09"},
+        {"ticker": "NVDA", "trade_date": "2025-01-16"},
+        {"ticker": "NVDA", "trade_date": "2025-01-23"},
+    ]
+    vectors = np.stack([_unit(1, 0.01), _unit(1, 0.02), _unit(1, 0), _unit(0, 1)])
+    assert near_duplicate_clusters(metadatas, vectors, 0.99) == [[2, 1, 0]]
+
+
+def test_clusters_never_span_tickers():
+    metadatas = [{"ticker": "NVDA", "added_at": 1.0}, {"ticker": "AAPL", "added_at": 2.0}]
+    vectors = np.stack([_unit(1, 0), _unit(1, 0)])
+    assert near_duplicate_clusters(metadatas, vectors, 0.9) == []
+
+
+def test_similarity_threshold_is_inclusive():
+    metadatas = [{"ticker": "NVDA", "added_at": 1.0}, {"ticker": "NVDA", "added_at": 2.0}]
+    vectors = np.stack([_unit(1, 0), _unit(1, 1)])
+    similarity = float(vectors[0] @ vectors[1])
+    assert near_duplicate_clusters(metadatas, vectors, similarity) == [[1, 0]]
+    assert near_duplicate_clusters(metadatas, vectors, similarity + 1e-3) == []
+
+
+def test_merge_keeps_distinct_recommendations_and_the_latest_outcome_day():
+    metadatas = [
+        {"recommendation": "a", "outcome_day": 20250201, "merged_count": 2},
+        {"recommendation": f"b{RECOMMENDATION_SEPARATOR}a", "outcome_day": 20250301},
+        {"recommendation": "c", "outcome_day": 20250101},
+    ]
+    merged = merge_metadata(metadatas, [0, 1, 2], max_recommendations=2)
+    assert merged["recommendation"] == f"a{RECOMMENDATION_SEPARATOR}b"
+    assert merged["merged_count"] == 4
+    assert merged["outcome_day"] == 20250301
+
+
+def test_merge_with_an_undated_entry_has_no_outcome_day():
+    merged = merge_metadata([{"recommendation": "a", "outcome_day": 20250201}, {"recommendation": "b"}], [0, 1], 5)
+    assert "outcome_day" not in merged
+
+
+def test_eviction_prefers_recent_supported_large_moves():
+    now = time.time()
+    metadatas = [
+        {"added_at": now - 400 * DAY, "merged_count": 1, "realized_return": 0.01},
+        {"added_at": now, "merged_count": 1, "realized_return": 0.01},
+        {"added_at": now, "merged_count": 5, "realized_return": -0.2},
+    ]
+    scores = eviction_scores(metadatas, now=now, half_life_days=90, weights={"recency": 0.5, "usefulness": 0.5})
+    assert list(np.argsort(scores)) == [0, 1, 2]
+    assert ((scores >= 0) & (scores <= 1)).all()
+
+
+def test_recency_halves_every_half_life():
+    now = time.time()
+    metadatas = [{"added_at": now}, {"added_at": now - 30 * DAY}]
+    scores = eviction_scores(metadatas, now=now, half_life_days=30, weights={"recency": 1.0, "usefulness": 0.0})
+    assert scores == pytest.approx([1.0, 0.5])
+
+
+@pytest.fixture
+def memory(tmp_path):
+    import chromadb
+
+    class Memory:
+        name = "bull_memory"
+        chroma_client = chromadb.PersistentClient(path=str(tmp_path))
+        situation_collection = chroma_client.get_or_create_collection(name)
+
+    return Memory()
+
+
+def _add(collection, ids, vector=(1.0, 0.0)):
+    collection.add(
+        ids=ids, documents=ids, embeddings=[list(vector)] * len(ids),
+        metadatas=[{"ticker": id_, "recommendation": id_} for id_ in ids],
+    )
+
+
+def test_restore_merges_a_recreated_collection_into_the_staging_copy(memory):
+    client = memory.chroma_client
+    staging = client.create_collection("bull_memory-compacting")
+    _add(staging, ["a", "b"])
+    # Crash after the old collection was deleted; the next process recreated it and wrote to it
+    client.delete_collection("bull_memory")
+    _add(client.get_or_create_collection("bull_memory"), ["new"])
+
+    assert restore_interrupted_rebuild(memory)
+    assert sorted(collection.name for collection in client.list_collections()) == ["bull_memory"]
+    assert sorted(load_entries(memory.situation_collection)[0]) == ["a", "b", "new"]
+
+
+def test_restore_keeps_the_live_collection_when_staging_was_incomplete(memory):
+    _add(memory.situation_collection, ["a", "b", "c"])
+    _add(memory.chroma_client.create_collection("bull_memory-compacting"), ["a"])
+    assert restore_interrupted_rebuild(memory)
+    assert sorted(load_entries(memory.situation_collection)[0]) == ["a", "b", "c"]
+    assert not restore_interrupted_rebuild(memory)
+
+
+def test_compact_memory_enforces_an_explicit_cap(memory, monkeypatch):
+    monkeypatch.setattr(compact_memories, "query_latency", lambda collection, vectors, queries: None)
+    _add(memory.situation_collection, ["a", "b", "c"])
+    report = compact_memory(memory, max_entries=0, similarity=1.1)
+    assert report["evicted"] == 3
+    assert memory.situation_collection.count() == 0
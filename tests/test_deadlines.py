@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from config.configurable import config
+from utility.deadlines import DeadlineRunner, NodeDeadlineExceeded
+
+
+@pytest.fixture(autouse=True)
+def short_deadline(monkeypatch):
+    monkeypatch.setitem(config, "node_deadlines", {})
+    monkeypatch.setitem(config, "default_node_deadline", 0.6)
+    monkeypatch.setitem(config, "fallback_deadline_share", 0.5)
+    monkeypatch.setitem(config, "hedge_enabled", False)
+
+
+def _sleeps(seconds, answer):
+    return RunnableLambda(lambda payload: (time.sleep(seconds), answer)[1])
+
+
+def _raises(exc):
+    def fail(payload):
+        raise exc
+
+    return RunnableLambda(fail)
+
+
+def test_fast_primary_answers():
+    result, record = DeadlineRunner("node", _sleeps(0, "primary"), _sleeps(0, "fallback")).invoke({})
+    assert (result, record["path"]) == ("primary", "primary")
+
+
+def test_slow_primary_falls_back_within_the_deadline():
+    started = time.monotonic()
+    result, record = DeadlineRunner("node", _sleeps(2, "primary"), _sleeps(0, "fallback")).invoke({})
+    assert (result, record["path"], record["reason"]) == ("fallback", "fallback", "deadline")
+    assert time.monotonic() - started < 0.6
+
+
+def test_fallback_is_bounded_by_the_deadline():
+    started = time.monotonic()
+    with pytest.raises(NodeDeadlineExceeded):
+        DeadlineRunner("node", _sleeps(2, "primary"), _sleeps(2, "fallback")).invoke({})
+    assert time.monotonic() - started < 1.0
+
+
+def test_transient_errors_fall_back():
+    result, record = DeadlineRunner("node", _raises(TimeoutError("read timeout")), _sleeps(0, "fallback")).invoke({})
+    assert (result, record["reason"]) == ("fallback", "error: TimeoutError")
+
+
+def test_other_errors_are_raised():
+    fallback_calls = []
+    fallback = RunnableLambda(lambda payload: fallback_calls.append(payload))
+    with pytest.raises(ValueError):
+        DeadlineRunner("node", _raises(ValueError("bad request")), fallback).invoke({})
+    assert fallback_calls == []
+
+
+def test_losing_attempts_are_cancelled(monkeypatch):
+    from utility.llm_scheduler import attempt_cancelled
+
+    monkeypatch.setitem(config, "hedge_enabled", True)
+    monkeypatch.setitem(config, "hedge_default_delay", 0.05)
+    events = []
+
+    def attempt(payload):
+        events.append(attempt_cancelled.get())
+        time.sleep(0.15 if len(events) == 1 else 0)
+        return "answer"
+
+    result, record = DeadlineRunner("hedged-node", RunnableLambda(attempt)).invoke({})
+    assert (result, record["path"]) == ("answer", "hedged")
+    assert [event.is_set() for event in events] == [True, False]
+    assert all(isinstance(event, threading.Event) for event in events)
+
+
+def test_admission_wait_does_not_hedge_or_fall_back(monkeypatch):
+    from utility.deadlines import latency_tracker
+    from utility.llm_scheduler import attempt_clock
+
+    monkeypatch.setitem(config, "hedge_enabled", True)
+    monkeypatch.setitem(config, "hedge_default_delay", 0.1)
+    calls = []
+
+    def queued_then_fast(payload):
+        calls.append(1)
+        # Stands in for waiting on the LLM scheduler, which pauses the attempt's clock
+        with attempt_clock.get().paused():
+            time.sleep(0.8)
+        return "primary"
+
+    result, record = DeadlineRunner("queued-node", RunnableLambda(queued_then_fast), _sleeps(0, "fallback")).invoke({})
+    assert (result, record["path"], len(calls)) == ("primary", "primary", 1)
+    assert record["seconds"] >= 0.8
+    assert latency_tracker.quantile("queued-node", 1.0, 1) < 0.1
+
+
+def test_executor_covers_every_api_thread(monkeypatch):
+    from utility.deadlines import executor_size
+
+    monkeypatch.setitem(config, "deadline_max_workers", None)
+    monkeypatch.setitem(config, "api_worker_threads", 40)
+    monkeypatch.setitem(config, "screener_max_parallel_runs", 2)
+    assert executor_size() == 126
+    monkeypatch.setitem(config, "deadline_max_workers", 8)
+    assert executor_size() == 8
@@ -0,0 +1,39 @@
+"""The benchmark and load-test harnesses must never write fixture data into the real `data_cache_dir`."""
+from benchmarks import loadtest
+from benchmarks.fakes import offline_environment
+from config.configurable import config
+
+
+def _snapshot(directory):
+    if not directory.exists():
+        return {}
+    return {path.relative_to(directory): path.stat().st_mtime_ns for path in directory.rglob("*")}
+
+
+def test_offline_benchmarks_leave_the_data_cache_untouched(cache_dir):
+    from benchmarks.run import bench_graph, bench_memory
+
+    before = _snapshot(cache_dir)
+    with offline_environment():
+        bench_graph(runs=1)
+        bench_memory([10], queries=2)
+    assert config["data_cache_dir"] == str(cache_dir)
+    assert _snapshot(cache_dir) == before
+
+
+def test_loadtest_app_runs_on_its_own_cache(cache_dir, tmp_path, monkeypatch):
+    import utility.tools as tools
+
+    loadtest_dir = tmp_path / "loadtest"
+    monkeypatch.setenv(loadtest.DATA_CACHE_ENV, str(loadtest_dir))
+    before = _snapshot(cache_dir)
+    try:
+        loadtest.create_offline_app()
+        assert config["data_cache_dir"] == str(loadtest_dir)
+        # Fixture articles land in the harness's corpus, not in either data cache
+        assert "Headline:" in tools.get_finnhub_news.invoke({"ticker": "NVDA", "start_date": "2024-12-20", "end_date": "2025-01-02"})
+        corpus_path = tools.get_news_corpus().path
+        assert not corpus_path.startswith(str(cache_dir))
+    finally:
+        loadtest._offline_stack.close()
+    assert _snapshot(cache_dir) == before
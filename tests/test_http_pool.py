@@ -0,0 +1,124 @@
+import pytest
+import requests
+
+import utility.http_pool as http_pool
+from utility.http_pool import CircuitBreaker, CircuitOpenError, call_with_retry, is_transient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_pool.time, "monotonic", clock)
+    return clock
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == "half-open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_probe_success_closes_and_failure_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_neutral_result_frees_the_probe_without_closing(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_neutral()
+    assert breaker.state == "half-open"
+    breaker.before_call()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+@pytest.mark.parametrize("exc, transient", [
+    (_http_error(429), True),
+    (_http_error(503), True),
+    (_http_error(400), False),
+    (_http_error(404), False),
+    (requests.ConnectionError(), True),
+    (TimeoutError(), True),
+    (ValueError(), False),
+])
+def test_is_transient(exc, transient):
+    assert is_transient(exc) is transient
+
+
+def test_call_with_retry_raises_client_errors_without_counting_them(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    monkeypatch.setattr(http_pool, "get_breaker", lambda provider: breaker)
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise _http_error(400)
+
+    with pytest.raises(requests.HTTPError):
+        call_with_retry("test", bad_request)
+    assert len(calls) == 1
+    assert breaker.state == "closed"
+
+
+def test_call_with_retry_retries_transient_errors(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=10, reset_timeout=30)
+    monkeypatch.setattr(http_pool, "get_breaker", lambda provider: breaker)
+    monkeypatch.setattr(http_pool.time, "sleep", lambda seconds: None)
+    outcomes = [_http_error(503), _http_error(503), "ok"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert call_with_retry("test", flaky) == "ok"
+    assert breaker.state == "closed"
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from utility.llm_scheduler import AdmissionCancelled, AttemptClock, LLMScheduler, TokenBucket, _ModelQueue, _Ticket
+
+LIMITS = {"rpm": 60, "tpm": 6000}
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=60)
+    start = bucket.updated
+    assert bucket.wait_time(60, start) == 0
+    bucket.consume(60)
+    # 1 unit per second
+    assert bucket.wait_time(10, start) == pytest.approx(10)
+    assert bucket.wait_time(10, start + 4) == pytest.approx(6)
+
+
+def test_token_bucket_caps_oversized_requests_at_capacity():
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.wait_time(10_000, bucket.updated) == 0
+    bucket.consume(10_000)
+    assert bucket.tokens == 0
+
+
+def test_token_bucket_adjust_credits_and_debits():
+    bucket = TokenBucket(per_minute=60)
+    bucket.consume(30)
+    bucket.adjust(-10)
+    assert bucket.tokens == pytest.approx(40, abs=0.1)
+    bucket.adjust(100)
+    assert bucket.tokens < 0
+
+
+def test_interactive_tickets_go_before_batch():
+    queue = _ModelQueue(LIMITS)
+    batch = _Ticket(10, 1, "backtest")
+    interactive = _Ticket(10, 0, "api")
+    queue.push(batch)
+    queue.push(interactive)
+    assert queue.pop_head() is interactive
+    assert queue.pop_head() is batch
+
+
+def test_runs_of_one_priority_take_turns():
+    queue = _ModelQueue(LIMITS)
+    a1, a2, b1 = _Ticket(1, 0, "a"), _Ticket(1, 0, "a"), _Ticket(1, 0, "b")
+    for ticket in (a1, a2, b1):
+        queue.push(ticket)
+    assert [queue.pop_head() for _ in range(3)] == [a1, b1, a2]
+
+
+def _wait_for_depth(scheduler, model, priority, depth):
+    for _ in range(200):
+        if scheduler.metrics()["queue_depth"].get(model, {}).get(priority) == depth:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"{priority} queue never reached {depth}")
+
+
+def test_scheduler_admits_interactive_before_queued_batch():
+    scheduler = LLMScheduler({"m": {"rpm": 600, "tpm": 1000}}, LIMITS)
+    scheduler.acquire("m", 1000)  # drain the token bucket
+    admitted = []
+
+    def call(priority):
+        scheduler.acquire("m", 500, priority=priority, run_key=priority)
+        admitted.append(priority)
+
+    batch = threading.Thread(target=call, args=("batch",))
+    batch.start()
+    _wait_for_depth(scheduler, "m", "batch", 1)
+    interactive = threading.Thread(target=call, args=("interactive",))
+    interactive.start()
+    _wait_for_depth(scheduler, "m", "interactive", 1)
+    scheduler.refund("m", 1000)
+    batch.join(5)
+    interactive.join(5)
+    assert admitted == ["interactive", "batch"]
+
+
+def test_remove_drops_a_waiting_ticket():
+    queue = _ModelQueue(LIMITS)
+    ticket = _Ticket(1, 1, "a")
+    queue.push(ticket)
+    queue.remove(ticket)
+    assert queue.head() is None
+    assert queue.depth() == {"interactive": 0, "batch": 0}
+
+
+def test_cancelled_call_leaves_the_queue():
+    scheduler = LLMScheduler({}, {"rpm": 600, "tpm": 1000})
+    scheduler.acquire("m", 1000)
+    cancelled = threading.Event()
+    errors = []
+
+    def call():
+        try:
+            scheduler.acquire("m", 500, cancelled=cancelled)
+        except AdmissionCancelled as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    _wait_for_depth(scheduler, "m", "interactive", 1)
+    cancelled.set()
+    scheduler.wake()
+    thread.join(5)
+    assert len(errors) == 1
+    assert scheduler.metrics()["queue_depth"]["m"]["interactive"] == 0
+
+
+def test_attempt_clock_stands_still_while_paused():
+    clock = AttemptClock()
+    time.sleep(0.05)
+    assert clock.elapsed() == 0
+    clock.resume()
+    with clock.paused():
+        time.sleep(0.1)
+    assert clock.elapsed() < 0.05
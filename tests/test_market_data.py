@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from utility.market_data import _missing_ranges, clamp_to_as_of, iso_date, trading_sessions
+
+
+def _clamp(end_date, as_of=None, inclusive=False):
+    """Run `clamp_to_as_of` inside a runnable, as the tools do, with `as_of` in the run metadata."""
+    metadata = {"as_of": as_of} if as_of else {}
+    return RunnableLambda(lambda _: clamp_to_as_of(end_date, inclusive=inclusive)).invoke(None, config={"metadata": metadata})
+
+
+def test_clamp_is_a_no_op_for_live_runs():
+    assert _clamp("2025-06-30") == "2025-06-30"
+
+
+def test_clamp_limits_the_end_date_to_as_of():
+    assert _clamp("2025-06-30", as_of="2025-01-02") == "2025-01-02"
+    assert _clamp("2024-12-01", as_of="2025-01-02") == "2024-12-01"
+
+
+def test_inclusive_ranges_stop_the_day_before_as_of():
+    assert _clamp("2025-06-30", as_of="2025-01-02", inclusive=True) == "2025-01-01"
+
+
+def _cache(*dates):
+    return pd.DataFrame({"Close": range(len(dates))}, index=pd.DatetimeIndex(pd.to_datetime(list(dates))))
+
+
+def test_trading_sessions_skip_weekends_and_exchange_holidays():
+    sessions = trading_sessions("2025-07-03", "2025-07-08")
+    # Friday 2025-07-04 is Independence Day
+    assert [day.strftime("%Y-%m-%d") for day in sessions] == ["2025-07-03", "2025-07-07"]
+
+
+def test_weekend_and_holiday_edges_count_as_covered():
+    cached = _cache("2025-06-30", "2025-07-03")
+    assert _missing_ranges(cached, "2025-06-28", "2025-07-07") == []
+
+
+def test_missing_sessions_at_the_edges_are_fetched():
+    cached = _cache("2025-06-30", "2025-07-03")
+    assert _missing_ranges(cached, "2025-06-27", "2025-07-08") == [("2025-06-27", "2025-06-30"), ("2025-07-04", "2025-07-08")]
+    assert _missing_ranges(None, "2025-06-27", "2025-07-08") == [("2025-06-27", "2025-07-08")]
+
+
+def test_clamp_normalizes_the_date():
+    assert _clamp("2025/06/30", as_of="2025-01-02") == "2025-01-02"
+    assert _clamp("June 30, 2025") == "2025-06-30"
+
+
+def test_iso_date_rejects_non_dates():
+    with pytest.raises(ValueError, match="not a date"):
+        iso_date("yesterday-ish")
@@ -0,0 +1,85 @@
+import datetime
+
+import pytest
+
+from utility.news_corpus import NewsCorpus, match_query
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    return NewsCorpus(tmp_path / "news_corpus.sqlite")
+
+
+def _coverage(corpus, ticker="NVDA"):
+    return corpus._connect().execute(
+        "SELECT start_date, end_date FROM coverage WHERE provider = 'finnhub' AND ticker = ? ORDER BY start_date", (ticker,)
+    ).fetchall()
+
+
+def _timestamp(date):
+    return int(datetime.datetime.fromisoformat(f"{date}T15:00:00+00:00").timestamp())
+
+
+def test_uncovered_ranges_of_an_empty_corpus(corpus):
+    assert corpus.uncovered_ranges("finnhub", "NVDA", "2025-01-01", "2025-01-31") == [("2025-01-01", "2025-01-31")]
+
+
+def test_uncovered_ranges_returns_the_gaps_between_intervals(corpus):
+    corpus.mark_covered("finnhub", "NVDA", "2025-01-05", "2025-01-10")
+    corpus.mark_covered("finnhub", "NVDA", "2025-01-20", "2025-01-25")
+    assert corpus.uncovered_ranges("finnhub", "NVDA", "2025-01-01", "2025-01-31") == [
+        ("2025-01-01", "2025-01-04"), ("2025-01-11", "2025-01-19"), ("2025-01-26", "2025-01-31"),
+    ]
+    assert corpus.uncovered_ranges("finnhub", "NVDA", "2025-01-06", "2025-01-09") == []
+
+
+def test_overlapping_and_adjacent_intervals_are_merged(corpus):
+    corpus.mark_covered("finnhub", "NVDA", "2025-01-01", "2025-01-10")
+    corpus.mark_covered("finnhub", "NVDA", "2025-01-08", "2025-01-15")
+    corpus.mark_covered("finnhub", "NVDA", "2025-01-16", "2025-01-20")
+    corpus.mark_covered("finnhub", "NVDA", "2025-02-01", "2025-02-05")
+    assert _coverage(corpus) == [("2025-01-01", "2025-01-20"), ("2025-02-01", "2025-02-05")]
+
+
+def test_an_interval_spanning_several_is_merged_into_one(corpus):
+    corpus.mark_covered("finnhub", "NVDA", "2025-01-01", "2025-01-03")
+    corpus.mark_covered("finnhub", "NVDA", "2025-01-10", "2025-01-12")
+    corpus.mark_covered("finnhub", "NVDA", "2024-12-30", "2025-01-11")
+    assert _coverage(corpus) == [("2024-12-30", "2025-01-12")]
+
+
+def test_coverage_is_per_ticker_and_provider(corpus):
+    corpus.mark_covered("finnhub", "NVDA", "2025-01-01", "2025-01-31")
+    assert corpus.uncovered_ranges("finnhub", "AAPL", "2025-01-01", "2025-01-02") == [("2025-01-01", "2025-01-02")]
+    assert corpus.uncovered_ranges("tavily:social", "NVDA", "2025-01-01", "2025-01-01") == [("2025-01-01", "2025-01-01")]
+
+
+def test_non_iso_dates_are_accepted(corpus):
+    corpus.mark_covered("finnhub", "NVDA", "2025/01/01", "Jan 10 2025")
+    assert corpus.uncovered_ranges("finnhub", "NVDA", "01/05/2025", "2025-01-12") == [("2025-01-11", "2025-01-12")]
+    with pytest.raises(ValueError, match="not a date"):
+        corpus.uncovered_ranges("finnhub", "NVDA", "last week", "2025-01-12")
+
+
+def test_articles_are_deduplicated_and_indexed_under_related_tickers(corpus):
+    article = {"datetime": _timestamp("2025-01-02"), "headline": "Chips", "summary": "Demand", "url": "https://a", "related": "NVDA,AMD"}
+    assert corpus.add_finnhub_news("NVDA", [article, dict(article, url="https://b")]) == "2025-01-02"
+    assert corpus.stats()["documents"] == 1
+    assert [item["headline"] for item in corpus.company_news("AMD", "2025-01-01", "2025-01-03")] == ["Chips"]
+
+
+def test_full_text_search_filters_by_ticker_date_and_provider(corpus):
+    corpus.add_finnhub_news("NVDA", [
+        {"datetime": _timestamp("2025-01-02"), "headline": "Blackwell demand", "summary": "GPU orders", "url": "https://a"},
+        {"datetime": _timestamp("2025-03-02"), "headline": "Blackwell delay", "summary": "", "url": "https://b"},
+    ])
+    corpus.add_search_hits("social", "NVDA", "2025-01-02", [{"url": "https://c", "content": "Blackwell hype on Reddit"}])
+    hits = corpus.search(match_query("Blackwell news"), "NVDA", "2025-01-01", "2025-01-31")
+    assert {hit["url"] for hit in hits} == {"https://a", "https://c"}
+    hits = corpus.search(match_query("Blackwell news"), "NVDA", "2025-01-01", "2025-01-31", provider="finnhub")
+    assert [hit["url"] for hit in hits] == ["https://a"]
+
+
+def test_match_query_drops_stopwords_dates_and_punctuation():
+    assert match_query("news for NVDA stock around 2025-01-02, (AI)") == '"NVDA" OR "AI"'
+    assert match_query("2025-01-02") == ""
@@ -0,0 +1,37 @@
+import reflect
+
+
+class Store:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def completed(self, before):
+        return iter(self.rows)
+
+
+class Ledger:
+    def reflected(self):
+        return {"done"}
+
+
+def _row(key, final_trade_decision, provenance):
+    return key, "2025-01-02", {"ticker": "nvda", "final_trade_decision": final_trade_decision}, provenance
+
+
+def test_pending_runs_need_a_production_run_with_a_verdict(monkeypatch):
+    monkeypatch.setattr(reflect, "is_production", lambda provenance: provenance == "prod")
+    store = Store([
+        _row("done", "FINAL TRANSACTION PROPOSAL: **BUY**", "prod"),
+        _row("stub", "FINAL TRANSACTION PROPOSAL: **BUY**", "loadtest"),
+        _row("undecided", "Buy, sell or hold all have merit here.", "prod"),
+        _row("legacy", "**Final Decision: Sell**\nJustification: guidance was cut.", "prod"),
+        _row("new", "Hold.\nFINAL TRANSACTION PROPOSAL: **HOLD**", "prod"),
+    ])
+    runs = reflect.pending_runs(store, Ledger())
+    assert [(run["key"], run["ticker"], run["decision"]) for run in runs] == [("legacy", "NVDA", "SELL"), ("new", "NVDA", "HOLD")]
+
+
+def test_outcomes_judge_the_call():
+    assert reflect.describe_outcome("BUY", 0.05, 5).endswith("so the call was right.")
+    assert reflect.describe_outcome("SELL", 0.05, 5).endswith("so the call was wrong.")
+    assert reflect.describe_outcome("HOLD", 0.05, 5) == "The decision was HOLD; the stock returned +5.00% over the next 5 trading days."
@@ -0,0 +1,106 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from stockstats import wrap
+
+from utility.market_data import price_cache_path
+from utility.screener import breakout, momentum, rsi, score_universe, screen
+
+
+def _random_walk(days, seed, drift=0.0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(drift, 0.02, days)))
+
+
+def _stockstats(closes):
+    return wrap(pd.DataFrame({"open": closes, "high": closes, "low": closes, "close": closes, "volume": 1}))
+
+
+def test_rsi_matches_stockstats():
+    closes = np.column_stack([_random_walk(120, seed) for seed in range(3)])
+    expected = [_stockstats(closes[:, column])["rsi_14"].iloc[-1] for column in range(3)]
+    # stockstats seeds Wilder's average from the first day instead of a simple mean of the first window
+    assert rsi(closes, 14) == pytest.approx(expected, abs=0.05)
+
+
+def test_rsi_extremes():
+    rising = np.arange(1, 31, dtype=float)
+    assert rsi(np.column_stack([rising, rising[::-1]]), 14) == pytest.approx([100.0, 0.0])
+
+
+def test_breakout_matches_the_bollinger_band():
+    closes = _random_walk(120, seed=1)
+    stats = _stockstats(closes)
+    half_width = (stats["boll_ub"].iloc[-1] - stats["boll"].iloc[-1]) / 2  # boll_ub is 2 std above the SMA
+    assert breakout(closes[:, None], 20)[0] == pytest.approx((closes[-1] - stats["boll"].iloc[-1]) / half_width)
+
+
+def test_rules_need_enough_history():
+    closes = _random_walk(10, seed=2)[:, None]
+    assert np.isnan(rsi(closes, 14)).all()
+    assert np.isnan(breakout(closes, 20)).all()
+    assert np.isnan(momentum(closes, 63)).all()
+
+
+def test_missing_closes_are_skipped():
+    closes = np.column_stack([_random_walk(100, seed=3), _random_walk(100, seed=3)])
+    closes[-1, 1] = np.nan
+    closes[50, 1] = np.nan
+    values = momentum(closes, 63)
+    assert values[1] == pytest.approx(closes[-2, 1] / closes[-64, 1] - 1)
+    assert np.isfinite(rsi(closes, 14)).all()
+
+
+
+def test_ragged_universe_is_scored_per_ticker():
+    # A 180-session matrix where the second ticker only has the last 100 sessions
+    closes = np.column_stack([_random_walk(180, seed=6), _random_walk(180, seed=7)])
+    closes[:80, 1] = np.nan
+    assert rsi(closes, 14)[1] == pytest.approx(rsi(closes[80:, 1:], 14)[0])
+    assert momentum(closes, 63)[1] == pytest.approx(closes[-1, 1] / closes[-64, 1] - 1)
+    _, score = score_universe(closes)
+    assert np.isfinite(score).all()
+
+
+def test_momentum_starts_from_the_last_close_before_a_gap():
+    closes = _random_walk(100, seed=8)[:, None]
+    closes[-64] = np.nan
+    assert momentum(closes, 63)[0] == pytest.approx(closes[-1, 0] / closes[-65, 0] - 1)
+
+def test_tickers_without_history_are_not_ranked():
+    closes = np.column_stack([_random_walk(120, seed=4), np.full(120, np.nan)])
+    closes[:100, 0] = np.nan
+    closes = np.column_stack([_random_walk(120, seed=5), closes])
+    _, score = score_universe(closes)
+    assert np.isfinite(score[0])
+    assert score[1] == -np.inf and score[2] == -np.inf
+
+
+def _cache_prices(ticker, dates, closes):
+    path = price_cache_path(ticker)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(
+        {"Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": 1.0},
+        index=pd.DatetimeIndex(dates, name="Date"),
+    ).to_parquet(path)
+
+
+def test_screen_ranks_by_weighted_rules_and_ignores_later_bars(cache_dir):
+    dates = pd.bdate_range(end="2025-01-31", periods=120)
+    _cache_prices("UP", dates, _random_walk(120, seed=6, drift=0.01))
+    _cache_prices("FLAT", dates, _random_walk(120, seed=7))
+    _cache_prices("DOWN", dates, _random_walk(120, seed=8, drift=-0.01))
+    weights = {"momentum": 1.0, "breakout": 0.0, "rsi": 0.0}
+    ranked = screen(["up", "flat", "down"], as_of="2025-01-31", top_n=2, weights=weights, fetch=False)
+    assert [row["ticker"] for row in ranked] == ["UP", "FLAT"]
+    assert ranked[0]["last_date"] == "2025-01-30"
+
+
+def test_screen_defaults_to_finished_sessions(cache_dir):
+    today = pd.Timestamp(datetime.date.today())
+    dates = pd.bdate_range(end=today, periods=120)
+    _cache_prices("NVDA", dates, _random_walk(120, seed=9))
+    ranked = screen(["NVDA"], fetch=False)
+    assert ranked[0]["last_date"] < today.strftime("%Y-%m-%d")
@@ -0,0 +1,46 @@
+import pytest
+import requests
+
+import utility.http_pool as http_pool
+import utility.tools as tools
+from config.configurable import config
+from utility.http_pool import CircuitBreaker
+from utility.news_corpus import NewsCorpus
+
+
+def _response(status, payload=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = requests.compat.json.dumps(payload or {}).encode()
+    return response
+
+
+@pytest.fixture
+def tavily(tmp_path, monkeypatch):
+    """A Tavily client whose POSTs answer from `tavily.responses`, with a private breaker and corpus."""
+    client = tools.TavilyClient("key")
+    client.responses = []
+    monkeypatch.setattr(client.session, "post", lambda url, json, timeout: client.responses.pop(0))
+    monkeypatch.setattr(tools, "get_tavily_client", lambda: client)
+    monkeypatch.setattr(tools, "get_news_corpus", lambda: NewsCorpus(tmp_path / "news_corpus.sqlite"))
+    breaker = CircuitBreaker("tavily", failure_threshold=3, reset_timeout=30)
+    monkeypatch.setattr(http_pool, "get_breaker", lambda provider: breaker)
+    monkeypatch.setattr(http_pool.time, "sleep", lambda seconds: None)
+    monkeypatch.setitem(config, "online_tools", True)
+    monkeypatch.setitem(config, "http_max_retries", 2)
+    client.breaker = breaker
+    return client
+
+
+def test_tavily_server_errors_are_retried(tavily):
+    hit = {"url": "https://example.com/a", "content": "NVDA beats estimates", "score": 0.9}
+    tavily.responses = [_response(503), _response(200, {"results": [hit]})]
+    assert tools.tavily_search("NVDA earnings") == [{"url": hit["url"], "content": hit["content"]}]
+    assert tavily.breaker.state == "closed"
+
+
+def test_tavily_failures_trip_the_breaker_and_come_back_as_tool_errors(tavily):
+    tavily.responses = [_response(429)] * 3
+    result = tools.get_social_media_sentiment.invoke({"ticker": "NVDA", "trade_date": "2025-01-02"})
+    assert result.startswith("Error searching social media sentiment for NVDA: 429")
+    assert tavily.breaker.state == "open"
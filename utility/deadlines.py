@@ -0,0 +1,192 @@
+"""
+Per-node deadlines and hedged requests for LLM calls.
+
+A node's LLM call is started on a worker thread. If it has not answered by the node's p95 latency
+(or `hedge_default_delay` until enough samples exist), a duplicate request is fired and whichever
+answers first wins. If nothing has answered when the primary share of the node's deadline is used
+up, or every attempt failed with a transient error (timeout, connection error, 429/5xx), the call
+falls back to the fallback model (the quick model for deep-thinking nodes), which gets the rest of
+the deadline (`fallback_deadline_share`). Other errors (e.g. a 400) are raised, not retried. The
+path taken is returned so nodes can record it in the run state (`llm_call_paths`).
+
+The hedge delay, the deadline and the latency samples count only the time an attempt is running:
+waiting for a worker thread or for LLM scheduler admission (rate limits, concurrency slot) is
+excluded (`AttemptClock`), so a saturated queue neither fires duplicates into itself nor pushes
+nodes onto the fallback model.
+
+Attempts whose answer is no longer needed are abandoned: queued ones never start and ones still
+waiting for LLM admission leave the scheduler queue. A request already sent cannot be cancelled and
+runs to completion on its worker thread; its real token usage is still reconciled.
+"""
+import collections
+import concurrent.futures
+import contextvars
+import functools
+import math
+import threading
+import time
+import sys
+from pathlib import Path
+
+# Ensure project root (containing the `config` package) is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config
+from utility.http_pool import is_transient
+from utility.llm_scheduler import AttemptClock, attempt_cancelled, attempt_clock, get_scheduler
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per node."""
+
+    def __init__(self, window=200):
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, node_name, seconds):
+        with self._lock:
+            self._samples[node_name].append(seconds)
+
+    def quantile(self, node_name, q, min_samples):
+        """Return the `q` quantile for a node, or None if fewer than `min_samples` are recorded."""
+        with self._lock:
+            samples = sorted(self._samples[node_name])
+        if len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, math.ceil(q * len(samples)) - 1)
+        return samples[max(index, 0)]
+
+
+latency_tracker = LatencyTracker()
+
+
+def executor_size():
+    """`deadline_max_workers`, or three workers (primary, hedge, fallback) per graph run the API can serve at once."""
+    if config["deadline_max_workers"] is not None:
+        return config["deadline_max_workers"]
+    return 3 * (config["api_worker_threads"] + config["screener_max_parallel_runs"])
+
+
+@functools.lru_cache(maxsize=None)
+def _executor():
+    # Stalled requests cannot be cancelled and keep their worker until the HTTP timeout fires;
+    # threads are only started when needed, so a large pool costs nothing while idle.
+    return concurrent.futures.ThreadPoolExecutor(max_workers=executor_size(), thread_name_prefix="llm-deadline")
+
+
+class NodeDeadlineExceeded(TimeoutError):
+    """Neither the primary attempts nor the fallback answered within the node's deadline."""
+
+
+class _Attempt:
+    __slots__ = ("path", "future", "cancelled", "clock", "seconds")
+
+    def __init__(self, path):
+        self.path = path
+        self.future = None
+        self.cancelled = threading.Event()
+        self.clock = AttemptClock()
+        self.seconds = None  # running time when it finished
+
+    def run(self, runnable, payload):
+        attempt_cancelled.set(self.cancelled)
+        attempt_clock.set(self.clock)
+        self.clock.resume()
+        try:
+            return runnable.invoke(payload)
+        finally:
+            self.seconds = self.clock.elapsed()
+
+
+def _submit(runnable, payload, path):
+    """Start one attempt on the worker pool."""
+    attempt = _Attempt(path)
+    # Each attempt runs in its own copy of the caller's context so the run config
+    # (callbacks, scheduler metadata) follows the call onto the worker thread.
+    ctx = contextvars.copy_context()
+    attempt.future = _executor().submit(ctx.run, attempt.run, runnable, payload)
+    return attempt
+
+
+def _abandon(attempts):
+    """Cancel attempts whose answer is no longer needed (see the module docstring)."""
+    if not attempts:
+        return
+    for attempt in attempts:
+        attempt.future.cancel()
+        attempt.cancelled.set()
+    get_scheduler().wake()
+
+
+def _wait(attempts, clock, budget):
+    """Wait until one of `attempts` finishes or `clock` has run for `budget` seconds; returns the finished ones."""
+    while (remaining := budget - clock.elapsed()) > 0:
+        # The clock stands still while the attempt waits for admission, so the budget is re-checked after each wait
+        done, _ = concurrent.futures.wait(
+            [attempt.future for attempt in attempts], timeout=remaining, return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        if done:
+            return [attempt for attempt in attempts if attempt.future in done]
+    return []
+
+
+class DeadlineRunner:
+    """Invoke a runnable under a node's deadline, with optional hedging and a fallback runnable."""
+
+    def __init__(self, node_name, primary, fallback=None):
+        self.node_name = node_name
+        self.primary = primary
+        self.fallback = fallback if fallback is not None else primary
+        self.deadline = config["node_deadlines"].get(node_name, config["default_node_deadline"])
+
+    def _hedge_delay(self):
+        if not config["hedge_enabled"]:
+            return None
+        delay = latency_tracker.quantile(self.node_name, config["hedge_quantile"], config["hedge_min_samples"])
+        return config["hedge_default_delay"] if delay is None else delay
+
+    def invoke(self, payload):
+        """Return `(result, record)` where `record` describes which path produced the result."""
+        start = time.monotonic()
+        primary_budget = self.deadline * (1 - config["fallback_deadline_share"])
+        primary = _submit(self.primary, payload, "primary")
+        # The node's deadline runs on the primary attempt's clock: it starts once that attempt is admitted
+        clock = primary.clock
+        pending = [primary]
+        hedge_delay = self._hedge_delay()
+        hedged = hedge_delay is None or hedge_delay >= primary_budget
+        error = None
+        try:
+            while pending and clock.elapsed() < primary_budget:
+                done = _wait(pending, clock, primary_budget if hedged else hedge_delay)
+                if not done and not hedged:
+                    # Still running (not just queued) after the node's usual latency: fire a duplicate
+                    pending.append(_submit(self.primary, payload, "hedged"))
+                    hedged = True
+                for attempt in done:
+                    pending.remove(attempt)
+                    error = attempt.future.exception()
+                    if error is None:
+                        latency_tracker.record(self.node_name, attempt.seconds)
+                        return attempt.future.result(), self._record(attempt.path, time.monotonic() - start)
+                    if not is_transient(error):
+                        # A duplicate or the fallback would fail the same way
+                        raise error
+        finally:
+            _abandon(pending)
+
+        # Primary budget used up (or every attempt failed transiently): the fallback gets the rest of the deadline
+        fallback = _submit(self.fallback, payload, "fallback")
+        if not _wait([fallback], fallback.clock, max(self.deadline - clock.elapsed(), 0)):
+            _abandon([fallback])
+            raise NodeDeadlineExceeded(f"{self.node_name}: no answer within the {self.deadline}s deadline") from error
+        reason = "deadline" if error is None else f"error: {type(error).__name__}"
+        return fallback.future.result(), self._record("fallback", time.monotonic() - start, reason=reason)
+
+    def _record(self, path, seconds, reason=None):
+        record = {"node": self.node_name, "path": path, "seconds": round(seconds, 3)}
+        if reason:
+            record["reason"] = reason
+        return record
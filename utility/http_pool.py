@@ -0,0 +1,262 @@
+"""
+Shared HTTP connection pools for the external providers (OpenAI, Finnhub, Yahoo Finance, Tavily).
+
+Every provider goes through one process-wide layer that gives us:
+- keep-alive sessions with bounded pool sizes (one TLS handshake per connection, not per call),
+- jittered exponential backoff on transient failures (429 / 5xx / connection errors) that honors Retry-After,
+- a per-provider circuit breaker so a failing provider fails fast instead of stalling every run.
+"""
+import email.utils
+import functools
+import random
+import threading
+import time
+import sys
+from pathlib import Path
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Ensure project root (containing the `config` package) is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config
+
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+# Provider exceptions that signal throttling or connection failures without carrying a status code
+# (yfinance rate limits; the OpenAI SDK's connection and timeout errors)
+TRANSIENT_EXCEPTION_NAMES = {"YFRateLimitError", "APIConnectionError", "APITimeoutError"}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a provider's circuit is open and calls are being short-circuited."""
+
+    def __init__(self, provider, retry_in):
+        super().__init__(f"Circuit for '{provider}' is open; retry in {retry_in:.1f}s")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker.
+    After `failure_threshold` consecutive transient failures the circuit opens for `reset_timeout`
+    seconds; the first call after that is let through as a probe and decides whether it closes again.
+    """
+
+    def __init__(self, provider, failure_threshold, reset_timeout):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.provider, self.reset_timeout - elapsed)
+            # Half-open: only one probe at a time
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.provider, 0.0)
+            self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_neutral(self):
+        """A call that neither proves the provider healthy nor counts as a failure (e.g. a 4xx)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider):
+    """Return the process-wide circuit breaker for a provider."""
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=config["circuit_breaker_threshold"],
+                reset_timeout=config["circuit_breaker_reset_seconds"],
+            )
+        return _breakers[provider]
+
+
+def _status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def is_transient(exc):
+    """True for errors worth retrying: throttling, server errors and connection-level failures."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, httpx.TransportError, TimeoutError)):
+        return True
+    if type(exc).__name__ in TRANSIENT_EXCEPTION_NAMES:
+        return True
+    return _status_code(exc) in TRANSIENT_STATUS_CODES
+
+
+def retry_after_seconds(exc):
+    """Parse the Retry-After header (delta-seconds or HTTP-date) from a failed response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff; a server-provided Retry-After is used as the floor."""
+    ceiling = min(config["http_backoff_max"], config["http_backoff_base"] * (2 ** attempt))
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, config["http_backoff_max"]))
+    return delay
+
+
+def call_with_retry(provider, fn, *args, **kwargs):
+    """
+    Call `fn` under the provider's circuit breaker, retrying transient failures with backoff.
+    Non-transient errors (bad request, auth, not found) are raised immediately; they neither trip
+    the breaker nor reset its failure count.
+    """
+    breaker = get_breaker(provider)
+    max_retries = config["http_max_retries"]
+    for attempt in range(max_retries + 1):
+        breaker.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:
+            if not is_transient(exc):
+                breaker.record_neutral()
+                raise
+            breaker.record_failure()
+            if attempt == max_retries:
+                raise
+            time.sleep(backoff_delay(attempt, retry_after_seconds(exc)))
+            continue
+        breaker.record_success()
+        return result
+
+
+def mount_pooled_adapter(session):
+    """Mount a bounded keep-alive connection pool on an existing `requests.Session`."""
+    adapter = HTTPAdapter(
+        pool_connections=config["http_pool_connections"],
+        pool_maxsize=config["http_pool_maxsize"],
+        pool_block=True,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class _CircuitBreakerTransport(httpx.HTTPTransport):
+    """httpx transport that reports every response to the provider's circuit breaker."""
+
+    def __init__(self, provider, **kwargs):
+        super().__init__(**kwargs)
+        self.breaker = get_breaker(provider)
+
+    def handle_request(self, request):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as exc:
+            # The OpenAI SDK retries any exception raised by the transport (wrapped as a connection
+            # error), which would defeat failing fast. A 503 marked `x-should-retry: false` is raised
+            # to the caller as an APIStatusError without retries.
+            return httpx.Response(
+                503,
+                headers={"x-should-retry": "false", "content-type": "application/json"},
+                json={"error": {"message": str(exc), "type": "circuit_open"}},
+                request=request,
+            )
+        try:
+            response = super().handle_request(request)
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        if response.status_code in TRANSIENT_STATUS_CODES:
+            self.breaker.record_failure()
+        elif 200 <= response.status_code < 300:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_neutral()
+        return response
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai_http_client():
+    """
+    Shared httpx client for every OpenAI-compatible call (chat models and embeddings).
+    Retries and Retry-After handling are done by the OpenAI SDK itself (`max_retries`),
+    so the transport only pools connections and feeds the circuit breaker.
+    """
+    transport = _CircuitBreakerTransport(
+        "openai",
+        limits=httpx.Limits(
+            max_connections=config["http_pool_maxsize"],
+            max_keepalive_connections=config["http_pool_connections"],
+            keepalive_expiry=config["http_keepalive_expiry"],
+        ),
+    )
+    return httpx.Client(transport=transport, timeout=config["http_timeout"])
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai_client():
+    """Shared OpenAI SDK client (used for embeddings) on top of the pooled httpx client."""
+    from openai import OpenAI
+
+    from config.llm_initializing import get_backend_url, get_openai_api_key
+
+    return OpenAI(
+        base_url=get_backend_url(),
+        api_key=get_openai_api_key(),
+        http_client=get_openai_http_client(),
+        max_retries=config["http_max_retries"],
+    )
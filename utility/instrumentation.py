@@ -0,0 +1,225 @@
+"""
+Instrumentation for graph runs: node execution, LLM calls, Toolkit tools and memory lookups.
+
+Everything is exported as Prometheus histograms/counters (served on `/metrics` by the API) and,
+for runs wrapped in `track_run(analysis_id)`, accumulated into a per-run timing breakdown that the
+API attaches to its response. The run is identified by the `analysis_id` in the run config metadata,
+which LangGraph/LangChain propagate to nodes, LLM calls and tool calls.
+"""
+import collections
+import contextlib
+import functools
+import inspect
+import threading
+import time
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+RUN_SECONDS = Histogram("agent_run_duration_seconds", "End-to-end graph run duration", buckets=LATENCY_BUCKETS)
+NODE_SECONDS = Histogram("agent_node_duration_seconds", "Graph node execution time", ["node"], buckets=LATENCY_BUCKETS)
+LLM_SECONDS = Histogram("agent_llm_request_duration_seconds", "Chat-model request latency", ["model", "node"], buckets=LATENCY_BUCKETS)
+LLM_TOKENS = Counter("agent_llm_tokens_total", "Tokens reported by the provider", ["model", "kind"])
+TOOL_SECONDS = Histogram("agent_tool_duration_seconds", "Toolkit tool latency", ["tool"], buckets=LATENCY_BUCKETS)
+TOOL_CALLS = Counter("agent_tool_calls_total", "Toolkit tool calls", ["tool", "status"])
+REACT_ITERATIONS = Histogram("agent_react_iterations", "Analyst ReAct iterations per run", ["node"], buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20))
+MEMORY_SECONDS = Histogram("agent_memory_operation_seconds", "FinancialSituationMemory embedding/Chroma time", ["collection", "operation"], buckets=LATENCY_BUCKETS)
+
+
+def _new_stat():
+    return {"calls": 0, "seconds": 0.0}
+
+
+class RunTimings:
+    """Per-run timing breakdown, returned to API callers alongside the analysis."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.nodes = collections.defaultdict(_new_stat)
+        self.llm = collections.defaultdict(lambda: {**_new_stat(), "prompt_tokens": 0, "completion_tokens": 0})
+        self.tools = collections.defaultdict(_new_stat)
+        self.memory = collections.defaultdict(_new_stat)
+        self.react_iterations = collections.Counter()
+        self._lock = threading.Lock()
+
+    def add(self, section, key, seconds, **counters):
+        with self._lock:
+            stat = getattr(self, section)[key]
+            stat["calls"] += 1
+            stat["seconds"] += seconds
+            for name, value in counters.items():
+                stat[name] += value
+
+    def count_iteration(self, node_name):
+        with self._lock:
+            self.react_iterations[node_name] += 1
+
+    def as_dict(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+
+        def rounded(stats):
+            return {key: {name: round(value, 4) if isinstance(value, float) else value for name, value in stat.items()} for key, stat in stats.items()}
+
+        with self._lock:
+            return {
+                "total_seconds": round(end - self.started, 4),
+                "nodes": rounded(self.nodes),
+                "llm": rounded(self.llm),
+                "tools": rounded(self.tools),
+                "memory": rounded(self.memory),
+                "react_iterations": dict(self.react_iterations),
+            }
+
+
+_active_runs = {}
+_active_runs_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def track_run(analysis_id):
+    """Collect a `RunTimings` breakdown for every call made under `analysis_id` until the block exits."""
+    timings = RunTimings()
+    with _active_runs_lock:
+        _active_runs[analysis_id] = timings
+    try:
+        yield timings
+    finally:
+        timings.finished = time.perf_counter()
+        with _active_runs_lock:
+            _active_runs.pop(analysis_id, None)
+        RUN_SECONDS.observe(timings.finished - timings.started)
+        for node_name, iterations in timings.react_iterations.items():
+            REACT_ITERATIONS.labels(node=node_name).observe(iterations)
+
+
+def _current_metadata():
+    from langchain_core.runnables.config import ensure_config
+
+    return ensure_config().get("metadata") or {}
+
+
+def _current_run(metadata=None):
+    metadata = _current_metadata() if metadata is None else metadata
+    analysis_id = metadata.get("analysis_id")
+    if analysis_id is None:
+        return None
+    with _active_runs_lock:
+        return _active_runs.get(analysis_id)
+
+
+def instrument_node(node_name, node, react=False):
+    """
+    Wrap a graph node (plain function or Runnable such as ToolNode) so its execution time is recorded.
+    `react=True` marks analyst nodes whose executions count as ReAct iterations.
+    """
+    def instrumented_node(state, config):
+        start = time.perf_counter()
+        try:
+            if hasattr(node, "invoke"):
+                return node.invoke(state, config)
+            return node(state)
+        finally:
+            seconds = time.perf_counter() - start
+            NODE_SECONDS.labels(node=node_name).observe(seconds)
+            timings = _current_run((config or {}).get("metadata") or {})
+            if timings is not None:
+                timings.add("nodes", node_name, seconds)
+                if react:
+                    timings.count_iteration(node_name)
+
+    return instrumented_node
+
+
+def record_llm_call(model, seconds, prompt_tokens, completion_tokens, metadata):
+    node_name = metadata.get("langgraph_node", "")
+    LLM_SECONDS.labels(model=model, node=node_name).observe(seconds)
+    LLM_TOKENS.labels(model=model, kind="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model=model, kind="completion").inc(completion_tokens)
+    timings = _current_run(metadata)
+    if timings is not None:
+        timings.add("llm", f"{node_name}:{model}", seconds, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def timed_tool(func=None, *, error=None):
+    """
+    Decorator for Toolkit tool functions (apply beneath `@tool`). A call fails when the function
+    raises; with `error` (a template over the tool's arguments) the exception is returned to the
+    model as "<error>: <exception>" instead of being raised.
+    """
+    if func is None:
+        return functools.partial(timed_tool, error=error)
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = func(*args, **kwargs)
+            status = "ok"
+            return result
+        except Exception as e:
+            if error is None:
+                raise
+            arguments = signature.bind(*args, **kwargs).arguments
+            return f"{error.format(**arguments)}: {e}"
+        finally:
+            seconds = time.perf_counter() - start
+            TOOL_SECONDS.labels(tool=func.__name__).observe(seconds)
+            TOOL_CALLS.labels(tool=func.__name__, status=status).inc()
+            timings = _current_run()
+            if timings is not None:
+                timings.add("tools", func.__name__, seconds)
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def time_memory(collection, operation):
+    """Time one embedding / Chroma operation of a FinancialSituationMemory."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        MEMORY_SECONDS.labels(collection=collection, operation=operation).observe(seconds)
+        timings = _current_run()
+        if timings is not None:
+            timings.add("memory", f"{collection}:{operation}", seconds)
+
+
+class _SchedulerCollector:
+    """Exports the LLM scheduler's queue depth and admission waits at scrape time."""
+
+    def describe(self):
+        # Registration only needs the metric names; calling `collect()` here would import the
+        # scheduler, which itself imports this module.
+        return [
+            GaugeMetricFamily("agent_llm_queue_depth", "LLM calls waiting for admission", labels=["model", "priority"]),
+            CounterMetricFamily("agent_llm_admitted", "LLM calls admitted by the scheduler", labels=["model", "priority"]),
+            CounterMetricFamily("agent_llm_admission_wait_seconds", "Seconds LLM calls waited for admission", labels=["model", "priority"]),
+        ]
+
+    def collect(self):
+        from utility.llm_scheduler import get_scheduler
+
+        snapshot = get_scheduler().metrics()
+        depth = GaugeMetricFamily("agent_llm_queue_depth", "LLM calls waiting for admission", labels=["model", "priority"])
+        for model, by_priority in snapshot["queue_depth"].items():
+            for priority, waiting in by_priority.items():
+                depth.add_metric([model, priority], waiting)
+        yield depth
+        admitted = CounterMetricFamily("agent_llm_admitted", "LLM calls admitted by the scheduler", labels=["model", "priority"])
+        waited = CounterMetricFamily("agent_llm_admission_wait_seconds", "Seconds LLM calls waited for admission", labels=["model", "priority"])
+        for key, stats in snapshot["wait"].items():
+            model, priority = key.rsplit(":", 1)
+            admitted.add_metric([model, priority], stats["admitted"])
+            waited.add_metric([model, priority], stats["wait_seconds_total"])
+        yield admitted
+        yield waited
+
+
+REGISTRY.register(_SchedulerCollector())
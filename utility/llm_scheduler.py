@@ -0,0 +1,391 @@
+"""
+Process-wide scheduler for LLM calls.
+
+Every chat-model call made by a graph node is admitted through one `LLMScheduler`:
+- per-model token buckets for requests/minute and tokens/minute (the provider's RPM/TPM limits),
+- priority classes, so interactive API runs are admitted before batch jobs,
+- fair (round-robin) queuing across concurrent runs within the same priority,
+- queue-depth and wait-time metrics,
+- an optional cap on in-flight provider requests, shared across processes (used by backtests).
+
+Priority and run identity are read from the run config metadata (`priority`, `analysis_id`),
+which LangGraph propagates to every `llm.invoke` inside a node.
+"""
+import asyncio
+import collections
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+import sys
+from pathlib import Path
+
+from langchain_openai import ChatOpenAI
+
+# Ensure project root (containing the `config` package) is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config
+from utility.instrumentation import record_llm_call
+
+# Lower rank is admitted first
+PRIORITY_CLASSES = {"interactive": 0, "batch": 1}
+DEFAULT_PRIORITY = "interactive"
+
+# Event set by the caller (e.g. `DeadlineRunner`) once it no longer needs the current attempt's answer
+attempt_cancelled = contextvars.ContextVar("llm_attempt_cancelled", default=None)
+# The current attempt's `AttemptClock`, paused while the call waits for admission
+attempt_clock = contextvars.ContextVar("llm_attempt_clock", default=None)
+
+
+class AttemptClock:
+    """
+    Running time of one LLM attempt, excluding time spent waiting for admission (rate limits and the
+    concurrency slot). Starts paused; the caller resumes it when the attempt starts running.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resumed_at = None
+        self._elapsed = 0.0
+
+    def pause(self):
+        with self._lock:
+            if self._resumed_at is not None:
+                self._elapsed += time.monotonic() - self._resumed_at
+                self._resumed_at = None
+
+    def resume(self):
+        with self._lock:
+            if self._resumed_at is None:
+                self._resumed_at = time.monotonic()
+
+    def elapsed(self):
+        with self._lock:
+            running = time.monotonic() - self._resumed_at if self._resumed_at is not None else 0.0
+            return self._elapsed + running
+
+    @contextlib.contextmanager
+    def paused(self):
+        self.pause()
+        try:
+            yield
+        finally:
+            self.resume()
+
+
+class AdmissionCancelled(Exception):
+    """The call was abandoned by its caller before the provider request was sent."""
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute / 60` units per second up to `capacity`."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta):
+        """Credit (`delta` < 0) or debit (`delta` > 0) units after the real usage is known."""
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class _Ticket:
+    __slots__ = ("tokens", "priority", "run_key", "enqueued_at")
+
+    def __init__(self, tokens, priority, run_key):
+        self.tokens = tokens
+        self.priority = priority
+        self.run_key = run_key
+        self.enqueued_at = time.monotonic()
+
+
+class _ModelQueue:
+    """Waiting tickets and rate buckets for one model."""
+
+    def __init__(self, limits):
+        self.requests = TokenBucket(limits["rpm"])
+        self.tokens = TokenBucket(limits["tpm"])
+        # priority -> run_key -> FIFO of tickets; the OrderedDict order is the round-robin order of runs
+        self.waiting = {rank: collections.OrderedDict() for rank in PRIORITY_CLASSES.values()}
+
+    def push(self, ticket):
+        self.waiting[ticket.priority].setdefault(ticket.run_key, collections.deque()).append(ticket)
+
+    def head(self):
+        for rank in sorted(self.waiting):
+            runs = self.waiting[rank]
+            if runs:
+                return runs[next(iter(runs))][0]
+        return None
+
+    def remove(self, ticket):
+        runs = self.waiting[ticket.priority]
+        tickets = runs.get(ticket.run_key)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del runs[ticket.run_key]
+
+    def pop_head(self):
+        ticket = self.head()
+        runs = self.waiting[ticket.priority]
+        tickets = runs.pop(ticket.run_key)
+        tickets.popleft()
+        if tickets:
+            # Move this run to the back so the other runs get the next slot
+            runs[ticket.run_key] = tickets
+        return ticket
+
+    def depth(self):
+        return {
+            name: sum(len(tickets) for tickets in self.waiting[rank].values())
+            for name, rank in PRIORITY_CLASSES.items()
+        }
+
+
+class LLMScheduler:
+    """Admission control for LLM calls across all runs in the process."""
+
+    def __init__(self, rate_limits, default_limits):
+        self.rate_limits = rate_limits
+        self.default_limits = default_limits
+        self._queues = {}
+        self._cond = threading.Condition()
+        self._stats = collections.defaultdict(lambda: {"admitted": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0})
+        self._concurrency_limit = None
+
+    def set_concurrency_limit(self, semaphore):
+        """Hold `semaphore` (e.g. a `multiprocessing.BoundedSemaphore`) around every provider request."""
+        self._concurrency_limit = semaphore
+
+    def concurrency_slot(self):
+        return self._concurrency_limit if self._concurrency_limit is not None else contextlib.nullcontext()
+
+    def _queue_for(self, model):
+        if model not in self._queues:
+            self._queues[model] = _ModelQueue(self.rate_limits.get(model, self.default_limits))
+        return self._queues[model]
+
+    def acquire(self, model, tokens, priority=DEFAULT_PRIORITY, run_key=None, cancelled=None):
+        """
+        Block until the call is admitted for `model` and return the seconds spent waiting.
+        `tokens` is the estimated prompt + completion size, reconciled later via `reconcile`.
+        If the `cancelled` event is set while waiting (followed by `wake()`), the call leaves the
+        queue without consuming anything and `AdmissionCancelled` is raised.
+        """
+        rank = PRIORITY_CLASSES.get(priority, PRIORITY_CLASSES[DEFAULT_PRIORITY])
+        ticket = _Ticket(tokens, rank, run_key or "default")
+        with self._cond:
+            queue = self._queue_for(model)
+            queue.push(ticket)
+            while True:
+                if cancelled is not None and cancelled.is_set():
+                    queue.remove(ticket)
+                    self._cond.notify_all()
+                    raise AdmissionCancelled(f"{model} call abandoned while waiting for admission")
+                if queue.head() is ticket:
+                    now = time.monotonic()
+                    delay = max(queue.requests.wait_time(1, now), queue.tokens.wait_time(tokens, now))
+                    if delay <= 0:
+                        queue.pop_head()
+                        queue.requests.consume(1)
+                        queue.tokens.consume(tokens)
+                        waited = now - ticket.enqueued_at
+                        self._record_wait(model, priority, waited)
+                        # The next ticket in line may be admissible right away
+                        self._cond.notify_all()
+                        return waited
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+
+    def wake(self):
+        """Re-check waiting calls, e.g. after some of them were cancelled."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def refund(self, model, tokens):
+        """Return an admitted call's request and tokens when it is abandoned before being sent."""
+        with self._cond:
+            queue = self._queue_for(model)
+            queue.requests.adjust(-1)
+            queue.tokens.adjust(-min(tokens, queue.tokens.capacity))
+            self._cond.notify_all()
+
+    def reconcile(self, model, estimated_tokens, actual_tokens):
+        """Correct the token bucket once the provider has reported real usage."""
+        with self._cond:
+            self._queue_for(model).tokens.adjust(actual_tokens - estimated_tokens)
+            self._cond.notify_all()
+
+    def _record_wait(self, model, priority, waited):
+        stats = self._stats[(model, priority)]
+        stats["admitted"] += 1
+        stats["wait_seconds_total"] += waited
+        stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+
+    def metrics(self):
+        """Snapshot of queue depth per model/priority and admission wait-time statistics."""
+        with self._cond:
+            return {
+                "queue_depth": {model: queue.depth() for model, queue in self._queues.items()},
+                "wait": {
+                    f"{model}:{priority}": {
+                        **stats,
+                        "wait_seconds_avg": stats["wait_seconds_total"] / stats["admitted"] if stats["admitted"] else 0.0,
+                    }
+                    for (model, priority), stats in self._stats.items()
+                },
+            }
+
+
+@functools.lru_cache(maxsize=None)
+def get_scheduler():
+    """The process-wide scheduler shared by every chat model."""
+    return LLMScheduler(config["llm_rate_limits"], config["llm_default_rate_limit"])
+
+
+def estimate_tokens(messages):
+    """Cheap prompt-size estimate (~4 characters per token); reconciled with real usage afterwards."""
+    chars = sum(len(str(message.content)) for message in messages)
+    return chars // 4 + config["llm_expected_completion_tokens"]
+
+
+# Set while a provider call is admitted, so a nested path (e.g. `_generate` delegating to `_stream`
+# when `streaming=True`) is not admitted twice
+_admitted = contextvars.ContextVar("llm_call_admitted", default=False)
+
+
+def _chunk_usage(chunk, usage):
+    """Copy streamed token usage (sent on the last chunk) into `usage` in the `token_usage` shape."""
+    usage_metadata = getattr(chunk.message, "usage_metadata", None)
+    if usage_metadata:
+        usage.update(
+            prompt_tokens=usage_metadata.get("input_tokens", 0),
+            completion_tokens=usage_metadata.get("output_tokens", 0),
+            total_tokens=usage_metadata.get("total_tokens", 0),
+        )
+
+
+class ScheduledChatOpenAI(ChatOpenAI):
+    """
+    `ChatOpenAI` whose calls are admitted by the process-wide `LLMScheduler`: blocking, async and
+    streaming calls (`invoke`, `ainvoke`, `stream`, `astream`, `astream_events`) alike.
+    """
+
+    def _admission(self, messages, run_manager):
+        from langchain_core.runnables.config import ensure_config
+
+        # Some streaming paths call `_stream` without a run manager; the run config still carries the metadata
+        metadata = getattr(run_manager, "metadata", None) or ensure_config().get("metadata") or {}
+        return metadata, estimate_tokens(messages)
+
+    def _acquire(self, metadata, estimated):
+        scheduler = get_scheduler()
+        cancelled = attempt_cancelled.get()
+        scheduler.acquire(
+            self.model_name,
+            estimated,
+            priority=metadata.get("priority", DEFAULT_PRIORITY),
+            run_key=metadata.get("analysis_id"),
+            cancelled=cancelled,
+        )
+        if cancelled is not None and cancelled.is_set():
+            scheduler.refund(self.model_name, estimated)
+            raise AdmissionCancelled(f"{self.model_name} call abandoned before it was sent")
+
+    def _finish(self, metadata, estimated, usage, seconds):
+        if usage.get("total_tokens"):
+            get_scheduler().reconcile(self.model_name, estimated, usage["total_tokens"])
+        record_llm_call(self.model_name, seconds, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), metadata)
+
+    @contextlib.contextmanager
+    def _admitted_call(self, messages, run_manager):
+        """Admit one provider call, hold the concurrency slot around it and record its usage; yields the usage dict to fill."""
+        if _admitted.get():
+            yield {}
+            return
+        metadata, estimated = self._admission(messages, run_manager)
+        clock = attempt_clock.get() or AttemptClock()
+        with clock.paused():
+            self._acquire(metadata, estimated)
+            slot = get_scheduler().concurrency_slot()
+            slot.__enter__()
+        usage = {}
+        token = _admitted.set(True)
+        try:
+            start = time.perf_counter()
+            yield usage
+            seconds = time.perf_counter() - start
+        finally:
+            _admitted.reset(token)
+            slot.__exit__(None, None, None)
+        self._finish(metadata, estimated, usage, seconds)
+
+    @contextlib.asynccontextmanager
+    async def _async_admitted_call(self, messages, run_manager):
+        """Async `_admitted_call`; the blocking admission and slot wait run off the event loop."""
+        if _admitted.get():
+            yield {}
+            return
+        metadata, estimated = self._admission(messages, run_manager)
+        clock = attempt_clock.get() or AttemptClock()
+        with clock.paused():
+            await asyncio.to_thread(self._acquire, metadata, estimated)
+            slot = get_scheduler().concurrency_slot()
+            await asyncio.to_thread(slot.__enter__)
+        usage = {}
+        token = _admitted.set(True)
+        try:
+            start = time.perf_counter()
+            yield usage
+            seconds = time.perf_counter() - start
+        finally:
+            _admitted.reset(token)
+            slot.__exit__(None, None, None)
+        self._finish(metadata, estimated, usage, seconds)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        with self._admitted_call(messages, run_manager) as usage:
+            result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            usage.update((result.llm_output or {}).get("token_usage") or {})
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async with self._async_admitted_call(messages, run_manager) as usage:
+            result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            usage.update((result.llm_output or {}).get("token_usage") or {})
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        with self._admitted_call(messages, run_manager) as usage:
+            for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                _chunk_usage(chunk, usage)
+                yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async with self._async_admitted_call(messages, run_manager) as usage:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                _chunk_usage(chunk, usage)
+                yield chunk
@@ -0,0 +1,198 @@
+"""
+Local price cache and point-in-time access for the market-data tools.
+
+Daily OHLCV history is cached per symbol as Parquet under `<data_cache_dir>/prices/`. Backtests
+prefetch the cache once and then run with `online_tools=False`, so every tool reads from it.
+
+Point-in-time: a run may carry an `as_of` date in its run config metadata (set by the backtest
+runner). Tools clamp their date ranges to it with `clamp_to_as_of`, so an analysis for a past trade
+date never sees data from that date or later, whatever range the LLM asks for.
+"""
+import datetime
+import functools
+import os
+import sys
+from pathlib import Path
+
+# Ensure project root (containing the `config` package) is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config
+from utility.http_pool import call_with_retry
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def current_as_of():
+    """The `as_of` date (yyyy-mm-dd) of the current run, or None for live runs."""
+    from langchain_core.runnables.config import ensure_config
+
+    return (ensure_config().get("metadata") or {}).get("as_of")
+
+
+def iso_date(value):
+    """
+    yyyy-mm-dd for a date string in any common format (tool arguments come from the LLM);
+    ValueError if it is not a date.
+    """
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        from dateutil import parser
+
+        try:
+            return parser.parse(value).date().isoformat()
+        except (ValueError, OverflowError):
+            raise ValueError(f"{value!r} is not a date; use yyyy-mm-dd") from None
+
+
+def clamp_to_as_of(end_date, inclusive=False):
+    """Limit an end date to the run's `as_of` date (to the day before it for inclusive ranges)."""
+    end_date = iso_date(end_date)
+    as_of = current_as_of()
+    if as_of is None:
+        return end_date
+    if inclusive:
+        as_of = (datetime.date.fromisoformat(as_of) - datetime.timedelta(days=1)).isoformat()
+    return min(end_date, as_of)
+
+
+def price_cache_path(symbol, config=config):
+    return Path(config["data_cache_dir"]) / "prices" / f"{symbol.upper()}.parquet"
+
+
+def load_cached_prices(symbol, config=config):
+    """The full cached daily history for `symbol` (DatetimeIndex), or None if nothing is cached."""
+    import pandas as pd
+
+    path = price_cache_path(symbol, config)
+    if not path.exists():
+        return None
+    return pd.read_parquet(path)
+
+
+def cached_price_history(symbol, start_date, end_date, config=config):
+    """Cached rows with `start_date <= date < end_date` (yfinance's exclusive end)."""
+    import pandas as pd
+
+    frame = load_cached_prices(symbol, config)
+    if frame is None:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+    return frame.loc[(frame.index >= pd.Timestamp(start_date)) & (frame.index < pd.Timestamp(end_date))]
+
+
+@functools.lru_cache(maxsize=1)
+def _exchange_calendar():
+    """NYSE full-day holidays (weekends are handled by the business-day offset)."""
+    from pandas.tseries.holiday import (
+        AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay, USMartinLutherKingJr, USMemorialDay,
+        USPresidentsDay, USThanksgivingDay, nearest_workday,
+    )
+
+    class ExchangeHolidays(AbstractHolidayCalendar):
+        rules = [
+            Holiday("New Year's Day", month=1, day=1, observance=nearest_workday),
+            USMartinLutherKingJr, USPresidentsDay, GoodFriday, USMemorialDay,
+            Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+            Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+            USLaborDay, USThanksgivingDay,
+            Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+        ]
+
+    return ExchangeHolidays()
+
+
+def trading_sessions(start_date, end_date):
+    """Expected exchange sessions in [start_date, end_date) from the holiday calendar (no cache needed)."""
+    import pandas as pd
+
+    sessions = pd.offsets.CustomBusinessDay(calendar=_exchange_calendar())
+    return pd.date_range(start_date, pd.Timestamp(end_date) - pd.Timedelta(days=1), freq=sessions)
+
+
+def _missing_ranges(cached, start_date, end_date):
+    """
+    Head/tail ranges of [start_date, end_date) that the cached frame does not cover. Only exchange
+    sessions count, so a range that starts or ends on a weekend or holiday is not re-fetched.
+    """
+    import pandas as pd
+
+    if cached is None or cached.empty:
+        return [(start_date, end_date)]
+    ranges = []
+    first, last = cached.index.min(), cached.index.max()
+    if len(trading_sessions(start_date, first.strftime("%Y-%m-%d"))):
+        ranges.append((start_date, first.strftime("%Y-%m-%d")))
+    tail_start = (last + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    if len(trading_sessions(tail_start, end_date)):
+        ranges.append((tail_start, end_date))
+    return ranges
+
+
+def _normalize_prices(data):
+    import pandas as pd
+
+    data = data[PRICE_COLUMNS].dropna(how="all")
+    # Daily bars are keyed by calendar date; drop the exchange timezone
+    data.index = pd.DatetimeIndex(data.index.date, name="Date")
+    # Today's bar may still be moving; it is cached once the session is over (tomorrow)
+    return data[data.index < pd.Timestamp(datetime.date.today())]
+
+
+def _merge_into_cache(symbol, cached, frames, config=config):
+    import pandas as pd
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return cached
+    merged = pd.concat(([] if cached is None else [cached]) + frames)
+    merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+    path = price_cache_path(symbol, config)
+    os.makedirs(path.parent, exist_ok=True)
+    merged.to_parquet(path)
+    return merged
+
+
+def update_price_cache(symbol, start_date, end_date, config=config):
+    """
+    Make sure [start_date, end_date) is covered by the cache, downloading only the missing head/tail.
+    Returns the cached history.
+    """
+    import yfinance as yf
+
+    cached = load_cached_prices(symbol, config)
+    frames = []
+    for range_start, range_end in _missing_ranges(cached, start_date, end_date):
+        data = call_with_retry("yfinance", yf.Ticker(symbol.upper()).history, start=range_start, end=range_end, auto_adjust=True)
+        if not data.empty:
+            frames.append(_normalize_prices(data))
+    return _merge_into_cache(symbol, cached, frames, config)
+
+
+def update_price_caches(symbols, start_date, end_date, config=config, batch_size=200):
+    """
+    Bulk version of `update_price_cache` for large universes: symbols whose cache does not cover
+    [start_date, end_date) are downloaded together, `batch_size` symbols per yfinance request.
+    """
+    import yfinance as yf
+
+    stale = [symbol.upper() for symbol in symbols if _missing_ranges(load_cached_prices(symbol, config), start_date, end_date)]
+    for offset in range(0, len(stale), batch_size):
+        batch = stale[offset:offset + batch_size]
+        data = call_with_retry("yfinance", yf.download, batch, start=start_date, end=end_date, auto_adjust=True, progress=False, threads=True)
+        if data.empty:
+            continue
+        for symbol in batch:
+            # Multi-ticker downloads have (field, ticker) columns
+            if symbol not in data.columns.get_level_values(-1):
+                continue
+            frame = data.xs(symbol, axis=1, level=-1)
+            _merge_into_cache(symbol, load_cached_prices(symbol, config), [_normalize_prices(frame)], config)
+
+
+def trading_days(symbol, start_date, end_date, config=config):
+    """Cached trading days in [start_date, end_date] as yyyy-mm-dd strings."""
+    end = (datetime.date.fromisoformat(end_date) + datetime.timedelta(days=1)).isoformat()
+    return [day.strftime("%Y-%m-%d") for day in cached_price_history(symbol, start_date, end, config).index]
@@ -1,63 +1,129 @@
-import chromadb
-from openai import OpenAI
+import functools
 import os
 import sys
+import uuid
 from pathlib import Path
 # Ensure project root (containing the `config` package) is on sys.path
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from config.configurable import config
+from config.configurable import config, ensure_dirs
+from utility.http_pool import get_openai_client
+from utility.instrumentation import time_memory
+
+MEMORY_NAMES = ("bull_memory", "bear_memory", "trader_memory", "invest_judge_memory", "risk_manager_memory")
+
+
+def outcome_day(date):
+    """yyyy-mm-dd -> yyyymmdd int, the form of the `outcome_day` metadata (Chroma compares numbers only)."""
+    return int(date.replace("-", ""))
+
+
+def format_situation(market_report, sentiment_report, news_report, fundamental_report):
+    """The situation text memories are stored and queried with: the four analyst reports."""
+    return (
+        f"Market Report: {market_report}\n"
+        f"Sentiment Report: {sentiment_report}\n"
+        f"News Report: {news_report}\n"
+        f"Fundamental Report: {fundamental_report}"
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_chroma_client(path):
+    """One Chroma PersistentClient per storage path, opened on first use."""
+    import chromadb
+
+    return chromadb.PersistentClient(path=path)
+
 
 class FinancialSituationMemory:
     def __init__(self, name, config):
         # store config for later use
         self.config = config
+        self.name = name
         self.embedding_model = "text-embedding-3-small"
-        # OpenAI client will pick up OPENAI_API_KEY from the environment
-        self.client = OpenAI(base_url=self.config["backend_url"])
+        # One pooled OpenAI client is shared by every memory instance
+        self.client = get_openai_client()
         # use a persistent client for real applications
-        self.chroma_client = chromadb.PersistentClient(path=self.config["data_cache_dir"])
+        ensure_dirs(self.config)
+        self.chroma_client = get_chroma_client(self.config["data_cache_dir"])
         self.situation_collection = self.chroma_client.get_or_create_collection(name=name)
 
     def get_embedding(self, text):
-        response = self.client.embeddings.create(model=self.embedding_model, input=text)
+        with time_memory(self.name, "embed"):
+            response = self.client.embeddings.create(model=self.embedding_model, input=text)
         return response.data[0].embedding # first embedding in the response
+
+    def get_embeddings(self, texts):
+        """Embeddings for many texts, `embedding_batch_size` inputs per request."""
+        embeddings = []
+        batch_size = self.config["embedding_batch_size"]
+        for offset in range(0, len(texts), batch_size):
+            with time_memory(self.name, "embed"):
+                response = self.client.embeddings.create(model=self.embedding_model, input=texts[offset:offset + batch_size])
+            embeddings += [item.embedding for item in response.data]
+        return embeddings
     
-    def add_situation(self, situations_and_advice):
+    def add_situation(self, situations_and_advice, ids=None, metadatas=None, embeddings=None):
+        """
+        Store (situation, recommendation) pairs. With `ids`, re-adding an entry updates it instead of
+        duplicating it; `metadatas` are stored next to each recommendation; precomputed `embeddings`
+        (e.g. shared by several memories) skip the embedding requests.
+        """
         if not situations_and_advice:
             return
-        offset = self.situation_collection.count()
-        ids = [str(offset + i) for i,_ in enumerate(situations_and_advice)]
+        if ids is None:
+            # Random ids: count-based ids would collide once compaction has deleted entries
+            ids = [uuid.uuid4().hex for _ in situations_and_advice]
         situations = [s for s,r in situations_and_advice]
         recommendations = [r for s,r in situations_and_advice]
-        embeddings = [self.get_embedding(s) for s in situations]
-        self.situation_collection.add(
-            documents=situations,
-            metadatas=[{"recommendation": r} for r in recommendations],
-            embeddings=embeddings,
-            ids=ids, )
+        metadatas = metadatas or [{} for _ in situations_and_advice]
+        embeddings = embeddings or self.get_embeddings(situations)
+        with time_memory(self.name, "add"):
+            self._call(lambda collection: collection.upsert(
+                documents=situations,
+                metadatas=[{**meta, "recommendation": r} for meta, r in zip(metadatas, recommendations)],
+                embeddings=embeddings,
+                ids=ids, ))
         
 
-    def get_memories(self, current_situation, n_matches=1):
-        if self.situation_collection.count() == 0:
+    def _call(self, operation):
+        """Run `operation(collection)`, reopening the collection by name if compaction has replaced it."""
+        from chromadb.errors import NotFoundError
+
+        try:
+            return operation(self.situation_collection)
+        except NotFoundError:
+            self.situation_collection = self.chroma_client.get_or_create_collection(name=self.name)
+            return operation(self.situation_collection)
+
+    def get_memories(self, current_situation, n_matches=1, as_of=None):
+        """
+        The recommendations of the `n_matches` most similar situations. Point-in-time runs (`as_of`,
+        by default the run's, see `utility.market_data`) only see lessons whose outcome was known
+        before `as_of`; entries without an `outcome_day` are skipped for them.
+        """
+        from utility.market_data import current_as_of
+
+        if self._call(lambda collection: collection.count()) == 0:
             return []
+        as_of = as_of or current_as_of()
+        where = {"outcome_day": {"$lt": outcome_day(as_of)}} if as_of else None
         query_embedding = self.get_embedding(current_situation)
-        results = self.situation_collection.query(
-            query_embeddings=[query_embedding],
-            n_results=min(n_matches, self.situation_collection.count()),
-            include=["metadatas"],
-        )
+        with time_memory(self.name, "query"):
+            results = self._call(lambda collection: collection.query(
+                query_embeddings=[query_embedding],
+                n_results=min(n_matches, collection.count()),
+                where=where,
+                include=["metadatas"],
+            ))
         return [{'recommendation': meta['recommendation']} for meta in results['metadatas'][0]]
-    
 
-print("FinancialSituationMemory class defined successfully.")
-# -- Mempry for his agent --
-bull_memory = FinancialSituationMemory("bull_memory", config)
-bear_memory = FinancialSituationMemory("bear_memory", config)
-trader_memory = FinancialSituationMemory("trader_memory", config)
-invest_judge_memory = FinancialSituationMemory("invest_judge_memory", config)
-risk_manager_memory = FinancialSituationMemory("risk_manager_memory", config)
 
-print("FinancialSituationMemory instances created for 5 agents.")
\ No newline at end of file
+# -- Memory for each agent, opened on first use --
+@functools.lru_cache(maxsize=None)
+def get_memory(name):
+    """Shared FinancialSituationMemory for one of the agents in `MEMORY_NAMES`."""
+    return FinancialSituationMemory(name, config)
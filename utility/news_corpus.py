@@ -0,0 +1,265 @@
+"""
+Local corpus of news articles and web-search hits.
+
+Every Finnhub article and Tavily hit the tools fetch is stored once in
+`<data_cache_dir>/news_corpus.sqlite`, deduplicated by URL or content hash, indexed by ticker and
+publish date, and full-text searchable (SQLite FTS5).
+
+The corpus also records which ranges were already fetched from each provider (`coverage`), so the
+tools answer from the corpus and only ask the provider for the uncovered part of a date range:
+- Finnhub company news: coverage is a set of date intervals per ticker,
+- Tavily searches: coverage is one (search kind, ticker, date) per query, e.g. ("social", "NVDA", "2025-01-02").
+"""
+import datetime
+import functools
+import hashlib
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Ensure project root (containing the `config` package) is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config, ensure_dirs
+from utility.market_data import iso_date
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    url TEXT UNIQUE,
+    content_hash TEXT NOT NULL UNIQUE,
+    provider TEXT NOT NULL,
+    headline TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    published_at INTEGER,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS document_tickers (
+    ticker TEXT NOT NULL,
+    published_date TEXT NOT NULL,
+    document_id INTEGER NOT NULL REFERENCES documents(id),
+    PRIMARY KEY (ticker, published_date, document_id)
+);
+CREATE TABLE IF NOT EXISTS search_hits (
+    kind TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    search_date TEXT NOT NULL,
+    document_id INTEGER NOT NULL REFERENCES documents(id),
+    rank INTEGER NOT NULL,
+    PRIMARY KEY (kind, ticker, search_date, document_id)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    provider TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS coverage_lookup ON coverage (provider, ticker, start_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(headline, body, content='documents', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts (rowid, headline, body) VALUES (new.id, new.headline, new.body);
+END;
+"""
+
+
+# Words left out of full-text queries built from a search sentence
+_STOPWORDS = frozenset(
+    "and are around for from into its news of on published recent relevant regarding stock the to with".split()
+)
+
+
+def _day(value, days=0):
+    return (datetime.date.fromisoformat(iso_date(value)) + datetime.timedelta(days=days)).isoformat()
+
+
+def match_query(text):
+    """FTS5 query matching any keyword of a search sentence (punctuation and dates dropped), or ''."""
+    words = [word for word in re.findall(r"[A-Za-z][A-Za-z0-9]+", text) if word.lower() not in _STOPWORDS]
+    return " OR ".join(f'"{word}"' for word in dict.fromkeys(words))
+
+
+def content_hash(*parts):
+    """Hash of the normalized text, so the same story under two URLs is stored once."""
+    text = " ".join(" ".join(str(part).split()).lower() for part in parts)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class NewsCorpus:
+    """SQLite-backed article / search-hit store with per-provider coverage tracking."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        # One connection per thread (tools run on ToolNode / API worker threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # ---- storage ----
+
+    def _add_document(self, conn, provider, url, headline, body, source="", published_at=None):
+        """Insert a document unless its URL or content is already stored; return its id."""
+        digest = content_hash(headline, body)
+        conn.execute(
+            "INSERT OR IGNORE INTO documents (url, content_hash, provider, headline, body, source, published_at, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url or None, digest, provider, headline, body, source, published_at, time.time()),
+        )
+        row = conn.execute(
+            "SELECT id FROM documents WHERE content_hash = ? OR (url IS NOT NULL AND url = ?)", (digest, url or None)
+        ).fetchone()
+        return row[0]
+
+    def add_finnhub_news(self, ticker, news_list):
+        """
+        Store Finnhub `company_news` items for `ticker` (and any other tickers listed in `related`).
+        Returns the earliest publish date stored, or None.
+        """
+        ticker = ticker.upper()
+        earliest = None
+        with self._connect() as conn:
+            for item in news_list:
+                published_at = int(item.get("datetime") or 0) or None
+                if published_at is None:
+                    continue
+                published_date = datetime.datetime.fromtimestamp(published_at, datetime.timezone.utc).date().isoformat()
+                earliest = min(earliest or published_date, published_date)
+                document_id = self._add_document(
+                    conn, "finnhub", item.get("url"), item.get("headline", ""), item.get("summary", ""),
+                    source=item.get("source", ""), published_at=published_at,
+                )
+                related = {symbol.strip().upper() for symbol in (item.get("related") or "").split(",") if symbol.strip()}
+                conn.executemany(
+                    "INSERT OR IGNORE INTO document_tickers (ticker, published_date, document_id) VALUES (?, ?, ?)",
+                    [(symbol, published_date, document_id) for symbol in related | {ticker}],
+                )
+        return earliest
+
+    def add_search_hits(self, kind, ticker, search_date, hits, final=True):
+        """
+        Store Tavily hits (`{"url", "content"}` dicts) for one search. `final=True` marks the search
+        covered so it is not re-issued; searches for today stay open because results are still changing.
+        """
+        with self._connect() as conn:
+            for rank, hit in enumerate(hits):
+                document_id = self._add_document(conn, "tavily", hit.get("url"), "", hit.get("content", ""))
+                conn.execute(
+                    "INSERT OR IGNORE INTO search_hits (kind, ticker, search_date, document_id, rank) VALUES (?, ?, ?, ?, ?)",
+                    (kind, ticker.upper(), search_date, document_id, rank),
+                )
+                if ticker:
+                    # Search hits carry no publish date; index them under the date they were searched for
+                    conn.execute(
+                        "INSERT OR IGNORE INTO document_tickers (ticker, published_date, document_id) VALUES (?, ?, ?)",
+                        (ticker.upper(), search_date, document_id),
+                    )
+            if final:
+                self._mark_covered(conn, f"tavily:{kind}", ticker.upper(), search_date, search_date)
+
+    # ---- coverage ----
+
+    def uncovered_ranges(self, provider, ticker, start_date, end_date):
+        """Sub-ranges of the inclusive [start_date, end_date] not yet fetched from `provider`."""
+        start_date, end_date = iso_date(start_date), iso_date(end_date)
+        rows = self._connect().execute(
+            "SELECT start_date, end_date FROM coverage WHERE provider = ? AND ticker = ? AND end_date >= ? AND start_date <= ? "
+            "ORDER BY start_date",
+            (provider, ticker.upper(), start_date, end_date),
+        ).fetchall()
+        gaps, cursor = [], start_date
+        for covered_start, covered_end in rows:
+            if covered_start > cursor:
+                gaps.append((cursor, _day(covered_start, -1)))
+            cursor = max(cursor, _day(covered_end, 1))
+            if cursor > end_date:
+                break
+        if cursor <= end_date:
+            gaps.append((cursor, end_date))
+        return gaps
+
+    def mark_covered(self, provider, ticker, start_date, end_date):
+        with self._connect() as conn:
+            self._mark_covered(conn, provider, ticker.upper(), iso_date(start_date), iso_date(end_date))
+
+    def _mark_covered(self, conn, provider, ticker, start_date, end_date):
+        # Merge with overlapping or adjacent intervals so lookups stay one row per contiguous range
+        rows = conn.execute(
+            "SELECT rowid, start_date, end_date FROM coverage WHERE provider = ? AND ticker = ? AND end_date >= ? AND start_date <= ?",
+            (provider, ticker, _day(start_date, -1), _day(end_date, 1)),
+        ).fetchall()
+        for rowid, covered_start, covered_end in rows:
+            start_date, end_date = min(start_date, covered_start), max(end_date, covered_end)
+        conn.executemany("DELETE FROM coverage WHERE rowid = ?", [(row[0],) for row in rows])
+        conn.execute(
+            "INSERT INTO coverage (provider, ticker, start_date, end_date) VALUES (?, ?, ?, ?)",
+            (provider, ticker, start_date, end_date),
+        )
+
+    # ---- queries ----
+
+    def company_news(self, ticker, start_date, end_date, limit=5):
+        """Newest articles about `ticker` published in the inclusive [start_date, end_date]."""
+        start_date, end_date = iso_date(start_date), iso_date(end_date)
+        rows = self._connect().execute(
+            "SELECT d.headline, d.body, d.url, d.source, t.published_date FROM document_tickers t "
+            "JOIN documents d ON d.id = t.document_id "
+            "WHERE t.ticker = ? AND t.published_date BETWEEN ? AND ? AND d.provider = 'finnhub' "
+            "ORDER BY d.published_at DESC LIMIT ?",
+            (ticker.upper(), start_date, end_date, limit),
+        ).fetchall()
+        return [{"headline": r[0], "summary": r[1], "url": r[2], "source": r[3], "published_date": r[4]} for r in rows]
+
+    def search_hits(self, kind, ticker, search_date):
+        """Stored hits of one search in their original rank order (`{"url", "content"}` dicts)."""
+        rows = self._connect().execute(
+            "SELECT d.url, d.body FROM search_hits s JOIN documents d ON d.id = s.document_id "
+            "WHERE s.kind = ? AND s.ticker = ? AND s.search_date = ? ORDER BY s.rank",
+            (kind, ticker.upper(), search_date),
+        ).fetchall()
+        return [{"url": url, "content": content} for url, content in rows]
+
+    def search(self, query, ticker=None, start_date=None, end_date=None, provider=None, limit=10):
+        """
+        Full-text search over headlines and bodies (FTS5 syntax, see `match_query`), optionally restricted
+        to a ticker / date range and a provider.
+        """
+        sql = (
+            "SELECT d.headline, d.body, d.url, d.provider FROM documents_fts f JOIN documents d ON d.id = f.rowid "
+            "WHERE documents_fts MATCH ?"
+        )
+        params = [query]
+        if provider is not None:
+            sql += " AND d.provider = ?"
+            params.append(provider)
+        if ticker is not None or start_date is not None or end_date is not None:
+            sql += " AND d.id IN (SELECT document_id FROM document_tickers WHERE ticker LIKE ? AND published_date BETWEEN ? AND ?)"
+            params += [ticker.upper() if ticker else "%", start_date or "0000-00-00", end_date or "9999-12-31"]
+        sql += " ORDER BY bm25(documents_fts) LIMIT ?"
+        rows = self._connect().execute(sql, params + [limit]).fetchall()
+        return [{"headline": r[0], "body": r[1], "url": r[2], "provider": r[3]} for r in rows]
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            "documents": conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0],
+            "searches": conn.execute("SELECT COUNT(*) FROM coverage WHERE provider LIKE 'tavily:%'").fetchone()[0],
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_news_corpus():
+    """The shared corpus under `data_cache_dir`, opened on first use."""
+    ensure_dirs(config)
+    return NewsCorpus(Path(config["data_cache_dir"]) / "news_corpus.sqlite")
@@ -0,0 +1,139 @@
+"""
+Persistent store of finished analyses, keyed by (ticker, trade_date, config hash). The hash covers
+the graph config plus the model endpoint and `online_tools`, so answers from a stub server or from
+cached-only data are never served as production results. The same provenance is stored in clear
+with each entry, so batch jobs (`reflect.py`) can select production runs.
+
+An analysis of a past trade date with a fixed graph config does not change, so it is computed once
+and served from here afterwards. Entries for today's (or a future) trade date are only reused for
+`result_cache_ttl_seconds`, since the day's data is still moving. So are degraded analyses, in which
+a node fell back to the quick model (`llm_call_paths`), so a full answer replaces them on a later
+request. Each entry carries a strong ETag (a hash of the stored payload) for conditional requests.
+"""
+import datetime
+import functools
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Ensure project root (containing the `config` package) is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import GRAPH_CONFIG_KEYS, config, config_hash, ensure_dirs
+
+# Settings that change an analysis without changing the graph
+PROVENANCE_KEYS = ("backend_url", "online_tools")
+
+
+def result_provenance(run_config, as_of=None):
+    """Where an analysis came from: its `PROVENANCE_KEYS` (endpoint resolved) and `as_of`."""
+    from config.llm_initializing import get_backend_url
+
+    provenance = {key: run_config.get(key) for key in PROVENANCE_KEYS}
+    provenance["backend_url"] = provenance["backend_url"] or get_backend_url()
+    return {**provenance, "as_of": as_of}
+
+
+def result_key(ticker, trade_date, run_config, as_of=None):
+    """Point-in-time runs (`as_of`) see less data than live ones, so they are stored separately."""
+    provenance = {**run_config, **result_provenance(run_config)}
+    key = f"{ticker.upper()}|{trade_date}|{config_hash(provenance, GRAPH_CONFIG_KEYS + PROVENANCE_KEYS)}"
+    return f"{key}|as_of={as_of}" if as_of else key
+
+
+def is_degraded(payload):
+    """Whether any node of the analysis answered from the fallback model."""
+    return any(record.get("path") == "fallback" for record in payload.get("llm_call_paths", []))
+
+
+def payload_etag(payload):
+    return '"' + hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """RFC 9110 If-None-Match check (weak comparison, `*` matches anything)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+
+class ResultStore:
+    """SQLite-backed result cache shared by every worker process of the API."""
+
+    def __init__(self, path, ttl_seconds):
+        self.path = str(path)
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, trade_date TEXT NOT NULL, etag TEXT NOT NULL, "
+                "payload TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+            if "provenance" not in columns:
+                # Stores created before provenance was recorded; their entries read as unknown (NULL)
+                conn.execute("ALTER TABLE results ADD COLUMN provenance TEXT")
+
+    def _connect(self):
+        # One connection per thread; FastAPI runs sync endpoints on a thread pool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def is_fresh(self, trade_date, created_at, degraded=False, now=None):
+        """Past trade dates never expire unless degraded; today's (or later) and degraded ones expire after the TTL."""
+        if trade_date < datetime.date.today().isoformat() and not degraded:
+            return True
+        return (now or time.time()) - created_at < self.ttl_seconds
+
+    def get(self, key):
+        """Return `(etag, payload)` for a fresh entry, or None."""
+        row = self._connect().execute(
+            "SELECT trade_date, etag, payload, created_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        payload = json.loads(row[2])
+        if not self.is_fresh(row[0], row[3], is_degraded(payload)):
+            return None
+        return row[1], payload
+
+    def put(self, key, trade_date, payload, provenance=None):
+        """Store `payload` under `key` with its `result_provenance` and return its ETag."""
+        etag = payload_etag(payload)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, trade_date, etag, payload, created_at, provenance) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, trade_date, etag, json.dumps(payload), time.time(), json.dumps(provenance) if provenance else None),
+            )
+        return etag
+
+    def completed(self, before_date):
+        """
+        `(key, trade_date, payload, provenance)` for every stored analysis with a trade date before
+        `before_date`, oldest first; `provenance` is None for entries stored without one.
+        """
+        rows = self._connect().execute(
+            "SELECT key, trade_date, payload, provenance FROM results WHERE trade_date < ? ORDER BY trade_date, key",
+            (before_date,),
+        )
+        for key, trade_date, payload, provenance in rows:
+            yield key, trade_date, json.loads(payload), json.loads(provenance) if provenance else None
+
+
+@functools.lru_cache(maxsize=None)
+def get_result_store():
+    """The result store under `data_cache_dir`, opened on first use."""
+    ensure_dirs(config)
+    return ResultStore(Path(config["data_cache_dir"]) / "results.sqlite", config["result_cache_ttl_seconds"])
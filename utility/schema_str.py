@@ -1,3 +1,4 @@
+import operator
 from typing import Annotated, Sequence, List
 from typing_extensions import TypedDict
 from langgraph.graph import MessagesState
@@ -39,5 +40,4 @@ class AgentState(MessagesState):
     trader_investment_plan: str
     risk_debate_state: RiskDebateState
     final_trade_decision: str
-
-print("AgentState, InvestDebateState, and RiskDebateState defined successfully.")    
+    llm_call_paths: Annotated[List[dict], operator.add] # Which LLM path (primary/hedged/fallback) each node took
@@ -0,0 +1,170 @@
+"""
+Vectorized quantitative pre-screener.
+
+Ranks a universe of tickers before any LLM is involved, so only the top N go through the trading
+graph. Closing prices from the local price cache are stacked into one (days x tickers) matrix and
+every rule is a batched NumPy computation over it:
+
+- momentum: trailing return over `screener_momentum_window` trading days,
+- breakout: Bollinger z-score of the last close vs. the `screener_breakout_window`-day SMA/std
+  (the same band `get_technical_indicators` reports as boll / boll_ub / boll_lb),
+- rsi: Wilder RSI over `screener_rsi_window` days; scores distance beyond the `screener_rsi_bounds`
+  extremes (oversold and overbought both count as signal).
+
+Each rule is standardized across the universe (z-score) and combined with `screener_weights`.
+"""
+import datetime
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Ensure project root (containing the `config` package) is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.configurable import config
+from utility.market_data import load_cached_prices, update_price_caches
+
+RULES = ("momentum", "breakout", "rsi")
+
+
+def load_close_matrix(tickers, end_date, lookback_days=None, fetch=None, config=config):
+    """
+    Stack cached closes into a (days x tickers) float matrix over the trading days before `end_date`
+    (exclusive, so screening for a date never sees that date). Missing values are NaN.
+    Returns `(dates, tickers, closes)`.
+    """
+    import pandas as pd
+
+    lookback_days = lookback_days or config["screener_lookback_days"]
+    fetch = config["online_tools"] if fetch is None else fetch
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+    start_date = (datetime.date.fromisoformat(end_date) - datetime.timedelta(days=lookback_days)).isoformat()
+    if fetch:
+        update_price_caches(tickers, start_date, end_date, config)
+
+    columns = {}
+    for ticker in tickers:
+        prices = load_cached_prices(ticker, config)
+        if prices is not None:
+            window = prices.loc[(prices.index >= pd.Timestamp(start_date)) & (prices.index < pd.Timestamp(end_date)), "Close"]
+            if not window.empty:
+                columns[ticker] = window
+    if not columns:
+        return np.array([], dtype="datetime64[D]"), [], np.empty((0, 0))
+    frame = pd.DataFrame(columns).sort_index()
+    return frame.index.to_numpy(), list(frame.columns), frame.to_numpy(dtype=float)
+
+
+def _last_valid(closes):
+    """Last non-NaN close per column (NaN where a column is empty)."""
+    valid = ~np.isnan(closes)
+    last_index = closes.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    last = closes[last_index, np.arange(closes.shape[1])]
+    return np.where(valid.any(axis=0), last, np.nan)
+
+
+def momentum(closes, window):
+    """
+    Return over the last `window` days per ticker, from the last close at or before the window's start
+    (a ticker that did not trade that day is not dropped; one listed later has NaN).
+    """
+    if closes.shape[0] <= window:
+        return np.full(closes.shape[1], np.nan)
+    return _last_valid(closes) / _last_valid(closes[:-window]) - 1
+
+
+def breakout(closes, window):
+    """Bollinger z-score of the last close against the trailing `window`-day band."""
+    if closes.shape[0] < window:
+        return np.full(closes.shape[1], np.nan)
+    recent = closes[-window:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (_last_valid(closes) - np.nanmean(recent, axis=0)) / np.nanstd(recent, axis=0, ddof=1)
+
+
+def rsi(closes, window):
+    """
+    Wilder RSI at the last day for every ticker (loop over days, vectorized over tickers). Each ticker is
+    seeded from the first `window` days of its own history, so shorter histories in the matrix still score.
+    """
+    deltas = np.diff(closes, axis=0)
+    if deltas.shape[0] < window:
+        return np.full(closes.shape[1], np.nan)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+    valid = ~np.isnan(deltas)
+    # Seed window per ticker: `window` days starting at its first change
+    seed_start = np.argmax(valid, axis=0)
+    seed_end = seed_start + window
+    days = np.arange(deltas.shape[0])[:, None]
+    seed = (days >= seed_start) & (days < seed_end) & valid
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_gain = np.where(seed, gains, 0).sum(axis=0) / seed.sum(axis=0)
+        avg_loss = np.where(seed, losses, 0).sum(axis=0) / seed.sum(axis=0)
+    for day in range(int(seed_end.min()), deltas.shape[0]):
+        # Missing days (and days inside a ticker's seed window) leave the running averages unchanged
+        update = (day >= seed_end) & valid[day]
+        avg_gain = np.where(update, (avg_gain * (window - 1) + gains[day]) / window, avg_gain)
+        avg_loss = np.where(update, (avg_loss * (window - 1) + losses[day]) / window, avg_loss)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = avg_gain / avg_loss
+        value = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + rs))
+    # Tickers whose history is shorter than one window have no RSI yet
+    return np.where(valid.any(axis=0) & (seed_end <= deltas.shape[0]), value, np.nan)
+
+
+def _zscore(values):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.nanstd(values)
+        return (values - np.nanmean(values)) / std if std > 0 else np.zeros_like(values)
+
+
+def score_universe(closes, weights=None, config=config):
+    """Raw rule values and the combined score for every column of `closes`."""
+    weights = weights or config["screener_weights"]
+    low, high = config["screener_rsi_bounds"]
+    raw = {
+        "momentum": momentum(closes, config["screener_momentum_window"]),
+        "breakout": breakout(closes, config["screener_breakout_window"]),
+        "rsi": rsi(closes, config["screener_rsi_window"]),
+    }
+    signals = {
+        "momentum": raw["momentum"],
+        "breakout": np.abs(raw["breakout"]),
+        # Distance beyond either bound; 0 inside the neutral band
+        "rsi": np.maximum(np.maximum(low - raw["rsi"], raw["rsi"] - high), 0),
+    }
+    score = sum(weights.get(rule, 0.0) * np.nan_to_num(_zscore(signals[rule])) for rule in RULES)
+    # Tickers without enough history for any rule are not ranked
+    complete = ~np.isnan(raw["momentum"]) & ~np.isnan(raw["breakout"]) & ~np.isnan(raw["rsi"])
+    return raw, np.where(complete, score, -np.inf)
+
+
+def screen(tickers, as_of=None, top_n=None, weights=None, fetch=None, config=config):
+    """
+    Rank `tickers` by the combined rule score using data strictly before `as_of` (default: today, i.e.
+    up to the last finished session) and return the top `top_n` as dicts, best first.
+    """
+    as_of = as_of or datetime.date.today().isoformat()
+    top_n = top_n or config["screener_top_n"]
+    dates, symbols, closes = load_close_matrix(tickers, as_of, fetch=fetch, config=config)
+    if not symbols:
+        return []
+    raw, score = score_universe(closes, weights, config)
+    order = np.argsort(-score, kind="stable")
+    ranked = []
+    for index in order[:top_n]:
+        if not np.isfinite(score[index]):
+            break
+        ranked.append({
+            "ticker": symbols[index],
+            "score": round(float(score[index]), 4),
+            "momentum": round(float(raw["momentum"][index]), 4),
+            "breakout_z": round(float(raw["breakout"][index]), 4),
+            "rsi": round(float(raw["rsi"][index]), 2),
+            "last_date": str(dates[-1])[:10],
+        })
+    return ranked
@@ -3,12 +3,10 @@ import sys
 from pathlib import Path
 
 import yfinance as yf
-import finnhub
 import pandas as pd
 import requests
 from datetime import datetime, timedelta
 from langchain_core.tools import tool
-from langchain_community.tools.tavily_search import TavilySearchResults
 from stockstats import wrap as stockstats_wrap
 from typing import Annotated
 from dotenv import load_dotenv
@@ -20,18 +18,154 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from config.configurable import config
+from utility.http_pool import call_with_retry, mount_pooled_adapter
+from utility.instrumentation import timed_tool
+from utility.market_data import cached_price_history, clamp_to_as_of, current_as_of, iso_date
+from utility.news_corpus import get_news_corpus, match_query
 # ---Tool Implementation---
 
 
+class FinnhubClient:
+    """Minimal Finnhub REST client (only the endpoints the tools use) on a bounded keep-alive pool."""
+
+    API_URL = "https://api.finnhub.io/api/v1"
+
+    def __init__(self, api_key):
+        self.session = mount_pooled_adapter(requests.Session())
+        self.session.params = {"token": api_key}
+        self.session.headers["Accept"] = "application/json"
+
+    def company_news(self, symbol, _from, to):
+        response = self.session.get(
+            f"{self.API_URL}/company-news",
+            params={"symbol": symbol, "from": _from, "to": to},
+            timeout=config["http_timeout"],
+        )
+        # HTTPError carries the response, so call_with_retry can classify 429/5xx as transient
+        response.raise_for_status()
+        return response.json()
+
+
+# Finnhub client is created once and reused across calls (one keep-alive pool)
+_finnhub_client = None
+
+
+def get_finnhub_client():
+    """Return the shared Finnhub client, creating it on first use."""
+    global _finnhub_client
+    if _finnhub_client is None:
+        _finnhub_client = FinnhubClient(api_key=os.getenv("FINNHUB_API_KEY"))
+    return _finnhub_client
+
+
+class TavilyClient:
+    """Minimal Tavily search client on a bounded keep-alive pool; HTTP errors raise instead of being returned as text."""
+
+    API_URL = "https://api.tavily.com/search"
+
+    def __init__(self, api_key, max_results=3):
+        self.session = mount_pooled_adapter(requests.Session())
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+        self.max_results = max_results
+
+    def search(self, query):
+        response = self.session.post(
+            self.API_URL, json={"query": query, "max_results": self.max_results}, timeout=config["http_timeout"],
+        )
+        response.raise_for_status()
+        return [{"url": hit["url"], "content": hit["content"]} for hit in response.json().get("results", [])]
+
+
 # The following three tools use Tavily for live, real-time web search.
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
-if TAVILY_API_KEY:
-    tavily_tool = TavilySearchResults(max_results=3, tavily_api_key=TAVILY_API_KEY)
-else:
-    tavily_tool = None
+# The Tavily client is created on first use (None when TAVILY_API_KEY is not set).
+_tavily_client = None
+
+
+def get_tavily_client():
+    """Return the shared Tavily client, creating it on first use."""
+    global _tavily_client
+    if _tavily_client is None:
+        api_key = os.getenv("TAVILY_API_KEY")
+        if not api_key:
+            return None
+        _tavily_client = TavilyClient(api_key)
+    return _tavily_client
+
+
+def tavily_search(query: str):
+    """Run a Tavily query with retry/backoff and the Tavily circuit breaker."""
+    return call_with_retry("tavily", get_tavily_client().search, query)
+
+
+def search_unavailable_reason():
+    """Why live web search cannot be used for this run, or None if it can."""
+    if not config["online_tools"]:
+        return "Live web search is disabled because online_tools is off."
+    if current_as_of() is not None:
+        # Search results cannot be restricted to what was known on a past date
+        return "Live web search is disabled for point-in-time (as_of) runs."
+    if get_tavily_client() is None:
+        return "Tavily search is disabled because TAVILY_API_KEY is not set."
+    return None
+
+
+def _last_final_day():
+    # News and search results for today are still changing, so only earlier days are marked covered
+    return (datetime.now().date() - timedelta(days=1)).isoformat()
+
+
+def stored_search(corpus, ticker: str, trade_date: str, query: str):
+    """
+    Full-text search of the stored documents from the `corpus_search_lookback_days` up to the trade date,
+    as Tavily-style hits. Point-in-time runs only search Finnhub articles: stored search hits are dated
+    by when they were searched for, not published, so they may describe later events.
+    """
+    end_date = clamp_to_as_of(trade_date, inclusive=True)
+    start_date = (datetime.fromisoformat(end_date) - timedelta(days=config["corpus_search_lookback_days"])).date().isoformat()
+    keywords = match_query(query)
+    if not keywords:
+        return []
+    documents = corpus.search(
+        keywords, ticker or None, start_date, end_date,
+        provider="finnhub" if current_as_of() is not None else None, limit=3,
+    )
+    return [{"url": doc["url"], "content": f"{doc['headline']}\n{doc['body']}".strip()} for doc in documents]
+
+
+def corpus_search(kind: str, ticker: str, trade_date: str, query: str):
+    """
+    Answer a Tavily search from the local corpus, querying Tavily only if this search was never run.
+    When live search is unavailable, the best full-text matches among the stored documents are returned.
+    """
+    corpus = get_news_corpus()
+    trade_date = iso_date(trade_date)
+    if current_as_of() is None and not corpus.uncovered_ranges(f"tavily:{kind}", ticker, trade_date, trade_date):
+        return corpus.search_hits(kind, ticker, trade_date)
+    reason = search_unavailable_reason()
+    if reason:
+        return stored_search(corpus, ticker, trade_date, query) or reason
+    hits = tavily_search(query)
+    corpus.add_search_hits(kind, ticker, trade_date, hits, final=trade_date <= _last_final_day())
+    return hits
+
+
+def fetch_uncovered_news(ticker: str, start_date: str, end_date: str):
+    """Fetch from Finnhub only the parts of [start_date, end_date] the corpus has not seen yet."""
+    corpus = get_news_corpus()
+    for gap_start, gap_end in corpus.uncovered_ranges("finnhub", ticker, start_date, end_date):
+        news_list = call_with_retry("finnhub", get_finnhub_client().company_news, ticker, _from=gap_start, to=gap_end)
+        earliest = corpus.add_finnhub_news(ticker, news_list)
+        covered_start, covered_end = gap_start, min(gap_end, _last_final_day())
+        if len(news_list) >= config["finnhub_news_page_size"] and earliest:
+            # A full page is cut off at the oldest articles: only the days after the earliest one returned
+            # are complete, the rest stays uncovered and is fetched again next time
+            covered_start = max(gap_start, (datetime.fromisoformat(earliest) + timedelta(days=1)).date().isoformat())
+        if covered_start <= covered_end:
+            corpus.mark_covered("finnhub", ticker, covered_start, covered_end)
 
 
 @tool
+@timed_tool(error="Error retrieving stock price data for {symbol}")
 def get_yfinance_data(
     symbol: Annotated[str, "The ticker symbol of the company to get data for"],
     start_date: Annotated[str, "Start date in yyyy-mm-dd forma"],
@@ -40,78 +174,80 @@ def get_yfinance_data(
     
     """Retrieve the stock price data for given ticker symbol from Yahoo Finance"""
 
-    try:
+    end_date = clamp_to_as_of(end_date)
+    if config["online_tools"]:
         ticker = yf.Ticker(symbol.upper())
-        data =ticker.history(start=start_date, end=end_date)
-        if data.empty:
-            return f"No data found for {symbol} between {start_date} and {end_date}"
-        return data.to_csv()
-    except Exception as e:
-        return f"Error retrieving stock price data for {symbol}: {str(e)}"
+        data = call_with_retry("yfinance", ticker.history, start=start_date, end=end_date, raise_errors=True)
+    else:
+        data = cached_price_history(symbol, start_date, end_date)
+    if data.empty:
+        return f"No data found for {symbol} between {start_date} and {end_date}"
+    return data.to_csv()
 
 
 @tool
+@timed_tool(error="Error retrieving technical indicators for {symbol}")
 def get_technical_indicators(
     symbol: Annotated[str, "The ticker symbol of the company to get data for"],
     start_date: Annotated[str, "Start date in yyyy-mm-dd forma"],
     end_date: Annotated[str, "End date in yyyy-mm-dd format"]
 ) -> str:
     """Retrieve key techincal indicators for stock using stockstats library"""
-    try:
-        df = yf.download(symbol, start=start_date, end=end_date)
-        if df.empty:
-            return f"No data found for {symbol} between {start_date} and {end_date}"
-        stock_df = stockstats_wrap(df)
-        indicators = stock_df[['macd', 'rsi_14', 'boll','boll_ub', 'boll_lb', 'close_50_sma','close_200_sma']]
-        return indicators.tail().to_csv()
-    except Exception as e:
-        return f"Error retrieving technical indicators for {symbol}: {str(e)}"
+    end_date = clamp_to_as_of(end_date)
+    if config["online_tools"]:
+        df = call_with_retry("yfinance", yf.download, symbol, start=start_date, end=end_date, progress=False)
+    else:
+        df = cached_price_history(symbol, start_date, end_date)
+    if df.empty:
+        return f"No data found for {symbol} between {start_date} and {end_date}"
+    stock_df = stockstats_wrap(df)
+    indicators = stock_df[['macd', 'rsi_14', 'boll','boll_ub', 'boll_lb', 'close_50_sma','close_200_sma']]
+    return indicators.tail().to_csv()
 
 
 
 
 @tool
+@timed_tool(error="Error retrieving news for {ticker} between {start_date} and {end_date}")
 def get_finnhub_news(
     ticker:str,
     start_date:str,
     end_date:str,
 ) -> str:
     """Get company news from Finnhub within date range"""
-    try:
-        finnhub_client = finnhub.Client(api_key=os.getenv("FINNHUB_API_KEY"))
-        news_list = finnhub_client.company_news(ticker, _from=start_date, to=end_date)
-        news_items = []
-        for news in news_list[:5]: # limit for 5 news items
-            news_items.append(f"Headline: {news['headline']}\nSummary: {news['summary']}")
-        return "\n\n".join(news_items) if news_items else "No news found for {ticker} between {start_date} and {end_date}"
-    except Exception as e:
-        return f"Error retrieving news for {ticker} between {start_date} and {end_date}: {str(e)}"
+    # Finnhub's end date is inclusive, so point-in-time runs stop the day before `as_of`
+    start_date, end_date = iso_date(start_date), clamp_to_as_of(end_date, inclusive=True)
+    # Every fetched article is kept in the local corpus; only uncovered dates go to Finnhub
+    if config["online_tools"]:
+        fetch_uncovered_news(ticker, start_date, end_date)
+    news_list = get_news_corpus().company_news(ticker, start_date, end_date, limit=5) # limit for 5 news items
+    news_items = []
+    for news in news_list:
+        news_items.append(f"Headline: {news['headline']}\nSummary: {news['summary']}")
+    return "\n\n".join(news_items) if news_items else f"No news found for {ticker} between {start_date} and {end_date}"
 
 
 
 @tool
+@timed_tool(error="Error searching social media sentiment for {ticker}")
 def get_social_media_sentiment(ticker: str, trade_date: str) -> str:
     """Performs a live web search for social media sentiment regarding a stock."""
-    if tavily_tool is None:
-        return "Tavily search is disabled because TAVILY_API_KEY is not set."
     query = f"social media sentiment and discussions for {ticker} stock around {trade_date}"
-    return tavily_tool.invoke({"query": query})
+    return corpus_search("social", ticker, trade_date, query)
 
 @tool
+@timed_tool(error="Error searching fundamental analysis for {ticker}")
 def get_fundamental_analysis(ticker: str, trade_date: str) -> str:
     """Performs a live web search for recent fundamental analysis of a stock."""
-    if tavily_tool is None:
-        return "Tavily search is disabled because TAVILY_API_KEY is not set."
     query = f"fundamental analysis and key financial metrics for {ticker} stock published around {trade_date}"
-    return tavily_tool.invoke({"query": query})
+    return corpus_search("fundamental", ticker, trade_date, query)
 
 @tool
+@timed_tool(error="Error searching macroeconomic news for {trade_date}")
 def get_macroeconomic_news(trade_date: str) -> str:
     """Performs a live web search for macroeconomic news relevant to the stock market."""
-    if tavily_tool is None:
-        return "Tavily search is disabled because TAVILY_API_KEY is not set."
     query = f"macroeconomic news and market trends affecting the stock market on {trade_date}"
-    return tavily_tool.invoke({"query": query})
+    return corpus_search("macro", "", trade_date, query)
 
 # --- Toolkit Class ---
 class Toolkit: